@@ -0,0 +1,255 @@
+import argparse
+import json
+import random
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+TURNS = ("single", "multi")
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+SHINGLE_BASE = np.uint64(1000003)
+
+
+def turn_text(outputs, turn: str) -> str:
+    # multi turn 프롬프트에는 두 답변이 모두 들어가므로 둘 다 비슷해야 같은 평가로 봄
+    return outputs[0] if turn == "single" else f"{outputs[0]}\x00{outputs[1]}"
+
+
+def shingle_hashes(text: str, size: int) -> np.ndarray:
+    """32-bit hashes of the distinct character `size`-grams of `text` (the whole text if shorter)."""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < size:
+        size = max(len(codes), 1)
+        codes = codes if len(codes) else np.zeros(1, dtype=np.uint64)
+    # 문자 n-gram 의 다항식 rolling hash 를 numpy 로 한 번에 계산 (uint64 overflow 는 의도된 mod 2^64)
+    hashes = np.zeros(len(codes) - size + 1, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(size):
+            hashes = hashes * SHINGLE_BASE + codes[offset : len(codes) - size + 1 + offset]
+    return np.unique((hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF))
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) whose LSH S-curve passes candidates comfortably below `threshold`.
+
+    Candidates are checked against the signature similarity afterwards, so the band split only
+    needs to keep false negatives rare: the highest S-curve midpoint at least 0.1 below.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [(bands, rows) for bands, rows in options if (1 / bands) ** (1 / rows) <= threshold - 0.1]
+    return max(below, key=lambda option: (1 / option[0]) ** (1 / option[1])) if below else options[0]
+
+
+class AnswerIndex:
+    """MinHash/LSH index of judged answers, bucketed per (question id, turn).
+
+    `query` returns the most similar judged answer whose estimated Jaccard similarity (over
+    character shingles) is at least `threshold`, so a near-identical answer from another model
+    variant can reuse or flag its judgement instead of paying for a new judge call.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.signatures: List[np.ndarray] = []
+        self.payloads: List[dict] = []
+        self.buckets: Dict[tuple, List[int]] = defaultdict(list)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingle_hashes(text, self.shingle_size)
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+    def _band_keys(self, question_id, turn: str, signature: np.ndarray):
+        for band in range(self.bands):
+            yield question_id, turn, band, signature[band * self.rows : (band + 1) * self.rows].tobytes()
+
+    def add(self, question_id, turn: str, text: str, payload: dict, signature: Optional[np.ndarray] = None):
+        signature = self.signature(text) if signature is None else signature
+        index = len(self.signatures)
+        self.signatures.append(signature)
+        self.payloads.append(payload)
+        for key in self._band_keys(question_id, turn, signature):
+            self.buckets[key].append(index)
+
+    def query(
+        self,
+        question_id,
+        turn: str,
+        text: str,
+        exclude_label: Optional[str] = None,
+        signature=None,
+        judge_id: Optional[dict] = None,
+    ) -> Optional[Tuple[float, dict]]:
+        """(similarity, payload) of the closest indexed answer at or above the threshold, else None.
+
+        With `judge_id`, only answers judged by that judge (model and template) are considered.
+        """
+        signature = self.signature(text) if signature is None else signature
+        candidates = set()
+        for key in self._band_keys(question_id, turn, signature):
+            candidates.update(self.buckets.get(key, ()))
+        best = None
+        for index in candidates:
+            payload = self.payloads[index]
+            if exclude_label is not None and payload["label"] == exclude_label:
+                continue
+            if judge_id is not None and payload.get("judge") != judge_id:
+                continue
+            similarity = float(np.mean(self.signatures[index] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[0]):
+                best = (similarity, payload)
+        return best
+
+
+def iter_judged_answers(evaluated_dir):
+    """Yield (label, question id, turn, text, judgement, judge) for every judged answer under `evaluated_dir`.
+
+    `judge` is the row's judge identity (model and template), None for rows written before it was recorded.
+    """
+    evaluated_dir = Path(evaluated_dir)
+    for path in sorted(evaluated_dir.rglob("*.jsonl")):
+        label = path.relative_to(evaluated_dir).as_posix()
+        if any(part.startswith(".") for part in path.relative_to(evaluated_dir).parts):
+            continue
+        with open(path, encoding="utf-8-sig") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                for turn in TURNS:
+                    judgement = row.get(f"query_{turn}")
+                    # 평가 불가 결과는 재사용하지 않음
+                    if not isinstance(judgement, dict) or judgement["judge_message"].startswith("Impossible"):
+                        continue
+                    yield label, row["id"], turn, turn_text(row["outputs"], turn), judgement, row.get("judge")
+
+
+def build_index(evaluated_dir, threshold: float = 0.9) -> AnswerIndex:
+    index = AnswerIndex(threshold)
+    for label, question_id, turn, text, judgement, judge in iter_judged_answers(evaluated_dir):
+        index.add(question_id, turn, text, {"label": label, "judgement": judgement, "judge": judge})
+    return index
+
+
+class NearDuplicates:
+    """Applies an `AnswerIndex` to the rows of a run: flags near-duplicate answers and, with
+    `reuse=True`, resolves their judge prompts in the `JudgePlan` with the indexed judgement.
+
+    Only judgements recorded with the plan's judge identity (same judge model and template) are
+    reused; other matches, including rows written without one, are only flagged.
+    """
+
+    def __init__(self, index: AnswerIndex, reuse: bool = False):
+        self.index = index
+        self.reuse = reuse
+        self.matched = 0
+        self.reused = 0
+        self.checked = 0
+
+    def apply(self, plan, label: str, output_label: str, rows: List[dict]):
+        for row in rows:
+            for turn in TURNS:
+                self.checked += 1
+                text = turn_text(row["outputs"], turn)
+                signature = self.index.signature(text)
+                match = None
+                if self.reuse and plan.judge_id is not None:
+                    match = self.index.query(
+                        row["id"], turn, text, exclude_label=output_label, signature=signature, judge_id=plan.judge_id
+                    )
+                reused = match is not None
+                if match is None:
+                    match = self.index.query(row["id"], turn, text, exclude_label=output_label, signature=signature)
+                if match is None:
+                    continue
+                similarity, payload = match
+                self.matched += 1
+                # 출력 행에 어떤 답변과 비슷했는지 남겨 재사용/검토 근거를 추적할 수 있게 함
+                row[f"near_duplicate_{turn}"] = {
+                    "label": payload["label"],
+                    "similarity": round(similarity, 3),
+                    "reused": reused,
+                }
+                if reused:
+                    self.reused += 1
+                    plan.resolve(label, row["id"], turn, dict(payload["judgement"]))
+
+    def summary(self) -> str:
+        if self.reuse:
+            action = f"평가 재사용 {self.reused}개, 같은 judge 의 평가가 없는 {self.matched - self.reused}개는 표시만"
+        else:
+            action = "표시만"
+        return f"- 유사 답변 (similarity >= {self.index.threshold}) : {self.checked}개 중 {self.matched}개 ({action})"
+
+
+def evaluate_reuse(evaluated_dir, thresholds: List[float], holdout: float = 0.2, seed: int = 0):
+    """Hold out a random share of models, index the rest and compare reused scores with the real ones."""
+    answers = list(iter_judged_answers(evaluated_dir))
+    models = sorted({label.rpartition("/")[0] for label, *_ in answers})
+    held_out = set(random.Random(seed).sample(models, max(1, round(len(models) * holdout))))
+    print(f"- {len(answers)} judged answers, {len(models)} models, {len(held_out)} held out (seed {seed})")
+
+    signer = AnswerIndex()
+    signatures = [signer.signature(text) for _, _, _, text, *_ in answers]
+
+    print(
+        "\n| threshold | held-out calls | reused | calls saved | mean abs diff | exact | within 1 "
+        "| max model drift |\n|---|---|---|---|---|---|---|---|"
+    )
+    for threshold in thresholds:
+        index = AnswerIndex(threshold)
+        for (label, question_id, turn, text, judgement, _), signature in zip(answers, signatures):
+            if label.rpartition("/")[0] not in held_out:
+                index.add(question_id, turn, text, {"label": label, "judgement": judgement}, signature)
+
+        differences = []
+        totals = defaultdict(lambda: [0.0, 0.0, 0])
+        n_calls = 0
+        for (label, question_id, turn, text, judgement, _), signature in zip(answers, signatures):
+            if label.rpartition("/")[0] not in held_out:
+                continue
+            n_calls += 1
+            actual = judgement["judge_score"]
+            reused = actual
+            match = index.query(question_id, turn, text, signature=signature)
+            if match is not None:
+                reused = match[1]["judgement"]["judge_score"]
+                differences.append(abs(reused - actual))
+            total = totals[label]
+            total[0] += actual
+            total[1] += reused
+            total[2] += 1
+
+        differences = np.array(differences)
+        # 재사용 점수로 계산한 파일 평균이 실제 평균과 얼마나 달라지는지 (리더보드 영향)
+        drift = max((abs(reused - actual) / count for actual, reused, count in totals.values()), default=0.0)
+        if len(differences):
+            stats = f"{differences.mean():.2f} | {(differences == 0).mean():.1%} | {(differences <= 1).mean():.1%}"
+        else:
+            stats = "- | - | -"
+        print(
+            f"| {threshold} | {n_calls} | {len(differences)} | {len(differences) / max(n_calls, 1):.1%} "
+            f"| {stats} | {drift:.3f} |"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Judgement reuse for near-duplicate answers: savings vs. drift")
+    parser.add_argument("-e", "--evaluated-dir", help="Evaluated outputs to index", default="./evaluated")
+    parser.add_argument(
+        "--thresholds", help="Similarity thresholds to compare", nargs="+", type=float, default=[0.8, 0.9, 0.95]
+    )
+    parser.add_argument("--holdout", help="Share of models held out as new variants", default=0.2, type=float)
+    parser.add_argument("--seed", help="Seed of the held-out model sample", default=0, type=int)
+    args = parser.parse_args(argv)
+    evaluate_reuse(args.evaluated_dir, args.thresholds, args.holdout, args.seed)
+
+
+if __name__ == "__main__":
+    main()
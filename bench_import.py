@@ -0,0 +1,40 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+TARGETS = {
+    "score --help": ["logickor.py", "score", "--help"],
+    "evaluate --help": ["logickor.py", "evaluate", "--help"],
+    "generate --help": ["logickor.py", "generate", "--help"],
+    "import pandas": ["-c", "import pandas"],
+    "import openai": ["-c", "import openai"],
+}
+
+
+def time_command(args, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI startup time of each subcommand")
+    parser.add_argument("-n", "--repeat", help="Runs per command", default=5, type=int)
+    parser.add_argument(
+        "-t", "--target", help="Only run these targets", action="append", choices=TARGETS, default=None
+    )
+    args = parser.parse_args()
+
+    print("| Command | median (ms) | min (ms) |\n|---|---|---|")
+    for name in args.target or TARGETS:
+        timings = time_command(TARGETS[name], args.repeat)
+        print(f"| {name} | {statistics.median(timings) * 1000:.0f} | {min(timings) * 1000:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mock_server import MockHandler, MockProfile, start_mock_server
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# 재현 가능한 부하 프로필 (mock_server.MockProfile 인자)
+PROFILES = {
+    "ideal": {"latency": "fixed:20"},
+    "realistic": {"latency": "lognormal:400,0.5", "error_rate": 0.02, "malformed_rate": 0.01, "retry_after_ms": 200},
+    "throttled": {"latency": "lognormal:300,0.5", "error_rate": 0.05, "retry_after_ms": 200, "capacity": 16},
+}
+
+# 대상 -> (스크립트, 추가 인자). {threads} 는 -t 값으로 채움
+TARGETS = {
+    "evaluate": ("evaluator.py", ["-t", "{threads}"]),
+    "evaluate-async": ("evaluator.py", ["--async", "-t", "{threads}"]),
+    "evaluate-adaptive": ("evaluator.py", ["--adaptive", "-t", "8", "--max-threads", "{threads}"]),
+    "generate": ("generator.py", ["-b", "openai", "-m", "bench/mock", "-c", "{threads}"]),
+}
+
+
+def prepare_workdir(workdir: Path, n_files: int):
+    """Copy questions.jsonl and the first `n_files` generated outputs (sorted) into `workdir`."""
+    shutil.copy(REPO_DIR / "questions.jsonl", workdir / "questions.jsonl")
+    files = sorted(
+        path
+        for path in (REPO_DIR / "generated").rglob("*.jsonl")
+        if not any(part.startswith(".") for part in path.relative_to(REPO_DIR).parts)
+    )[:n_files]
+    for path in files:
+        target = workdir / "input" / path.relative_to(REPO_DIR / "generated")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(path, target)
+
+
+def count_rows(output_dir: Path):
+    rows = failed = 0
+    for path in output_dir.rglob("*.jsonl"):
+        if any(part.startswith(".") for part in path.relative_to(output_dir).parts):
+            continue
+        with open(path, encoding="utf-8-sig") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rows += 1
+                row = json.loads(line)
+                if any(
+                    (row.get(turn) or {}).get("judge_message", "").startswith("Impossible")
+                    for turn in ("query_single", "query_multi")
+                ):
+                    failed += 1
+    return rows, failed
+
+
+def count_retries(metrics_file: Path) -> int:
+    if not metrics_file.exists():
+        return 0
+    with open(metrics_file, encoding="utf-8") as f:
+        return sum(json.loads(line)["attempt"] > 0 for line in f if line.strip())
+
+
+def run_target(target: str, profile_name: str, base_url: str, threads: int, n_files: int) -> dict:
+    script, extra_args = TARGETS[target]
+    extra_args = [arg.format(threads=threads) for arg in extra_args]
+    # 대상마다 새 프로필을 써서 같은 부하가 처음부터 재현되도록 함
+    profile = MockHandler.profile = MockProfile(**PROFILES[profile_name])
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        prepare_workdir(workdir, n_files)
+        metrics_file = workdir / "metrics.jsonl"
+        if script == "evaluator.py":
+            command = ["-o", "input", "-k", "mock", "--base-url", base_url, "--no-cache"]
+            command += ["--metrics-file", str(metrics_file)]
+            output_dir = workdir / "evaluated"
+        else:
+            command = ["-k", "mock", "--base_url", base_url, "--metrics_file", str(metrics_file)]
+            output_dir = workdir / "generated"
+
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, str(REPO_DIR / script), *command, *extra_args],
+            cwd=workdir,
+            capture_output=True,
+            text=True,
+        )
+        wall_time = time.perf_counter() - start
+        # 실패한 실행도 표에 남겨 부하 프로필별 취약점이 드러나도록 함
+        error = process.stderr.strip().splitlines()[-1].split(":")[0] if process.returncode != 0 else None
+        rows, failed = count_rows(output_dir) if output_dir.exists() else (0, 0)
+        retries = count_retries(metrics_file)
+
+    stats = dict(profile.stats)
+    return {
+        "profile": profile_name,
+        "target": target,
+        "wall_time": wall_time,
+        "rows": rows,
+        "rows_per_second": rows / wall_time,
+        "requests": stats.get("requests", 0),
+        "retries": retries,
+        "throttled": stats.get("throttled", 0),
+        "malformed": stats.get("malformed", 0),
+        "failed_rows": failed,
+        "error": error,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput of the evaluator and generator against mock_server.py")
+    parser.add_argument("-p", "--profile", help="Only run these load profiles", action="append", choices=PROFILES)
+    parser.add_argument("--target", help="Only run these targets", action="append", choices=TARGETS)
+    parser.add_argument("-t", "--threads", help="Concurrency passed to every target", default=32, type=int)
+    parser.add_argument("-n", "--files", help="Generated files judged by evaluator targets", default=4, type=int)
+    parser.add_argument("--json", help="Also write the results to this JSON file", default=None)
+    args = parser.parse_args(argv)
+
+    server = start_mock_server()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    results = []
+    print(
+        "| profile | target | wall (s) | rows | rows/s | requests | retries | 429 | malformed | failed rows | error |\n"
+        "|---|---|---|---|---|---|---|---|---|---|---|"
+    )
+    for profile_name in args.profile or PROFILES:
+        for target in args.target or TARGETS:
+            result = run_target(target, profile_name, base_url, args.threads, args.files)
+            results.append(result)
+            print(
+                f"| {profile_name} | {target} | {result['wall_time']:.1f} | {result['rows']} "
+                f"| {result['rows_per_second']:.1f} | {result['requests']} | {result['retries']} "
+                f"| {result['throttled']} | {result['malformed']} | {result['failed_rows']} "
+                f"| {result['error'] or ''} |",
+                flush=True,
+            )
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
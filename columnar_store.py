@@ -0,0 +1,419 @@
+import argparse
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from score import ScoreAccumulator, iter_rows
+
+STORE_SUFFIX = ".parquet"
+MANIFEST_KEY = b"logickor.manifest"
+ROW_GROUP_SIZE = 65536
+BOM = "\ufeff"
+# 원본 줄 직렬화 방식. pandas to_json 은 구분자를 붙여 쓰고 '/' 를 '\/' 로 escape 함
+STYLES = [
+    {"compact": True, "escape_slash": True},
+    {"compact": False, "escape_slash": False},
+    {"compact": True, "escape_slash": False},
+    {"compact": False, "escape_slash": True},
+]
+JUDGEMENT_COLUMNS = ("query_single", "query_multi")
+
+
+def _is_string_list(value) -> bool:
+    return value is None or (isinstance(value, list) and all(item is None or isinstance(item, str) for item in value))
+
+
+def _is_judgement(value) -> bool:
+    return value is None or (
+        isinstance(value, dict)
+        and list(value) == ["judge_message", "judge_score"]
+        and isinstance(value["judge_message"], str)
+        and isinstance(value["judge_score"], (int, float))
+        and not isinstance(value["judge_score"], bool)
+    )
+
+
+def _score_kind(value) -> Optional[str]:
+    if value is None:
+        return None
+    return "int" if isinstance(value["judge_score"], int) else "float"
+
+
+# 타입이 정해진 열과 값 검사. 검사를 통과하지 못하거나 목록에 없는 키는 JSON 문자열 열로 저장
+COLUMN_CHECKS = {
+    "id": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "category": lambda value: value is None or isinstance(value, str),
+    "questions": _is_string_list,
+    "outputs": _is_string_list,
+    "references": _is_string_list,
+    "query_single": _is_judgement,
+    "query_multi": _is_judgement,
+}
+
+
+def _judgement_type(score_kind: str):
+    import pyarrow as pa
+
+    score_type = pa.int64() if score_kind == "int" else pa.float64()
+    return pa.struct([("judge_message", pa.string()), ("judge_score", score_type)])
+
+
+def _column_types():
+    import pyarrow as pa
+
+    return {
+        "id": pa.int64(),
+        # 파일/카테고리 이름은 반복되므로 dictionary 로 인코딩
+        "path": pa.dictionary(pa.int32(), pa.string()),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+        "questions": pa.list_(pa.string()),
+        "outputs": pa.list_(pa.string()),
+        "references": pa.list_(pa.string()),
+        "__absent__": pa.list_(pa.string()),
+        # float 열에 섞여 있던 정수 점수의 열 이름
+        "__int_scores__": pa.list_(pa.string()),
+        # 아래 직렬화로 원본 줄이 재현되지 않는 행만 원본 줄을 보관
+        "__raw__": pa.string(),
+    }
+
+
+def dump_row(row: dict, style: dict) -> str:
+    if style["compact"]:
+        text = json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(row, ensure_ascii=False)
+    # '/' 는 JSON 문자열 안에만 나오므로 그대로 치환해도 됨
+    return text.replace("/", "\\/") if style["escape_slash"] else text
+
+
+def split_lines(file_path) -> Tuple[bool, List[str], bool]:
+    """(has BOM, lines, ends with newline) of a JSONL file, read as text without any normalisation."""
+    text = Path(file_path).read_bytes().decode("utf-8")
+    has_bom = text.startswith(BOM)
+    lines = text[len(BOM) :].split("\n") if has_bom else text.split("\n")
+    final_newline = len(lines) > 1 and lines[-1] == ""
+    if final_newline:
+        lines.pop()
+    return has_bom, lines, final_newline
+
+
+def parse_line(line: str) -> Optional[dict]:
+    # iter_rows 와 같이 앞뒤 공백과 줄 앞 BOM 은 무시. 빈 줄은 None
+    line = line.strip()
+    if line.startswith(BOM):
+        line = line[len(BOM) :]
+    return json.loads(line) if line else None
+
+
+def iter_jsonl_files(src_dir) -> Iterator[Tuple[Path, str]]:
+    src_dir = Path(src_dir)
+    for file_path in sorted(src_dir.rglob("*.jsonl")):
+        relative_path = file_path.relative_to(src_dir)
+        if not any(part.startswith(".") for part in relative_path.parts):
+            yield file_path, relative_path.as_posix()
+
+
+def export_tree(src_dir, store_path, compression: str = "zstd") -> dict:
+    """Pack every JSONL file under `src_dir` into one Parquet file.
+
+    Keys with a known shape become typed columns (path and category as Arrow dictionaries; the
+    repeated question texts rely on Parquet's page dictionaries, shared across files by the large
+    row groups); anything else is kept as a JSON text column, and keys missing from a row are
+    listed in `__absent__`. The manifest records each file's serialization style, BOM, blank
+    lines and final newline, and a row whose line that style does not reproduce keeps the line
+    in `__raw__`, so `import_tree` writes every file back byte for byte.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    files = list(iter_jsonl_files(src_dir))
+
+    # 1차: 열 목록, 각 열을 타입 있는 열로 저장할 수 있는지, 파일별 직렬화 방식 확인
+    key_order, typed, score_kinds = {}, {}, {key: set() for key in JUDGEMENT_COLUMNS}
+    manifest_files = []
+    start = 0
+    for file_path, relative_path in files:
+        has_bom, lines, final_newline = split_lines(file_path)
+        file_keys, n_rows, blank_lines, style = {}, 0, {}, None
+        for number, line in enumerate(lines):
+            row = parse_line(line)
+            if row is None:
+                blank_lines[str(number)] = line
+                continue
+            if style is None:
+                style = next((style for style in STYLES if dump_row(row, style) == line), STYLES[1])
+            n_rows += 1
+            for key, value in row.items():
+                file_keys.setdefault(key, None)
+                key_order.setdefault(key, None)
+                check = COLUMN_CHECKS.get(key)
+                typed[key] = typed.get(key, True) and check is not None and check(value)
+                if key in score_kinds and typed[key] and value is not None:
+                    score_kinds[key].add(_score_kind(value))
+        # 파일의 행은 저장소 안에서 연속되므로 시작 위치만 기록
+        manifest_files.append(
+            {
+                "path": relative_path,
+                "bom": has_bom,
+                "start": start,
+                "rows": n_rows,
+                "keys": list(file_keys),
+                "style": style or STYLES[1],
+                "blank_lines": blank_lines,
+                "final_newline": final_newline,
+            }
+        )
+        start += n_rows
+
+    column_types = _column_types()
+    # 점수가 모두 정수면 정수 열. 정수와 실수가 섞이면 float 열에 두고 정수였던 행은 __int_scores__ 에 기록
+    for key in JUDGEMENT_COLUMNS:
+        column_types[key] = _judgement_type("int" if score_kinds[key] == {"int"} else "float")
+    int_score_columns = [key for key in JUDGEMENT_COLUMNS if typed.get(key) and score_kinds[key] == {"int", "float"}]
+    typed_columns = [key for key in key_order if typed[key]]
+    json_columns = [key for key in key_order if not typed[key]]
+    schema = pa.schema(
+        [("path", column_types["path"])]
+        + [(key, column_types[key]) for key in typed_columns]
+        + [(key, pa.string()) for key in json_columns]
+        + [(key, column_types[key]) for key in ("__absent__", "__int_scores__", "__raw__")]
+    )
+    manifest = {"files": manifest_files, "json_columns": json_columns}
+    schema = schema.with_metadata({MANIFEST_KEY: json.dumps(manifest, ensure_ascii=False).encode("utf-8")})
+
+    # 2차: 전체를 하나의 테이블로 모아 큰 row group 으로 기록 (dictionary 가 파일 경계를 넘어 공유됨)
+    columns = {name: [] for name in schema.names}
+    for (file_path, relative_path), info in zip(files, manifest_files):
+        for line in split_lines(file_path)[1]:
+            row = parse_line(line)
+            if row is None:
+                continue
+            columns["path"].append(relative_path)
+            for key in typed_columns:
+                columns[key].append(row.get(key))
+            for key in json_columns:
+                columns[key].append(json.dumps(row[key], ensure_ascii=False) if key in row else None)
+            absent = [key for key in key_order if key not in row]
+            columns["__absent__"].append(absent or None)
+            int_scores = [key for key in int_score_columns if row.get(key) and _score_kind(row[key]) == "int"]
+            columns["__int_scores__"].append(int_scores or None)
+            # 읽을 때는 파일의 키 순서로 행을 복원하므로 키 순서까지 같아야 원본 줄이 재현됨
+            exact = dump_row(row, info["style"]) == line and list(row) == [key for key in info["keys"] if key in row]
+            columns["__raw__"].append(None if exact else line)
+
+    table = pa.table({name: pa.array(values, type=schema.field(name).type) for name, values in columns.items()})
+    table = table.replace_schema_metadata(schema.metadata)
+    store_path = Path(store_path)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = store_path.with_name(store_path.name + ".tmp")
+    pq.write_table(table, tmp_path, compression=compression, row_group_size=ROW_GROUP_SIZE)
+    tmp_path.replace(store_path)
+    return manifest
+
+
+class ColumnarStore:
+    """Memory-mapped reader for a store written by `export_tree`; only the requested columns are decoded."""
+
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+
+        self.path = Path(path)
+        self.parquet = pq.ParquetFile(self.path, memory_map=True)
+        self.manifest = json.loads(self.parquet.schema_arrow.metadata[MANIFEST_KEY])
+        self.file_info = {entry["path"]: entry for entry in self.manifest["files"]}
+        self.cached = None
+
+    def files(self) -> List[str]:
+        return [entry["path"] for entry in self.manifest["files"]]
+
+    def read(self, columns: Optional[List[str]] = None, paths: Optional[List[str]] = None):
+        """Read `columns` (nested fields as "query_single.judge_score") for the given file paths."""
+        import pyarrow.compute as pc
+
+        if columns is not None and "path" not in columns:
+            columns = ["path"] + columns
+        table = self.parquet.read(columns=columns)
+        if paths is not None:
+            table = table.filter(pc.is_in(pc.cast(table["path"], "string"), value_set=_string_array(paths)))
+        return table
+
+    def _records(self, path: str) -> List[Tuple[dict, Optional[str]]]:
+        # 파일이 걸친 row group 에서 그 파일의 열만 읽음. 연속으로 같은 row group 을 읽으면 재사용
+        info = self.file_info[path]
+        if not info["rows"]:
+            return []
+        names = set(self.parquet.schema_arrow.names)
+        columns = [key for key in info["keys"] + ["__absent__", "__int_scores__", "__raw__"] if key in names]
+        begin, end = info["start"], info["start"] + info["rows"]
+        groups, offset, group_start = [], 0, None
+        for i in range(self.parquet.metadata.num_row_groups):
+            n_rows = self.parquet.metadata.row_group(i).num_rows
+            if offset < end and offset + n_rows > begin:
+                group_start = offset if group_start is None else group_start
+                groups.append(i)
+            offset += n_rows
+        cache_key = (tuple(groups), tuple(columns))
+        if self.cached is None or self.cached[0] != cache_key:
+            self.cached = (cache_key, self.parquet.read_row_groups(groups, columns=columns))
+        table = self.cached[1].slice(begin - group_start, info["rows"])
+
+        json_columns = set(self.manifest["json_columns"])
+        records = []
+        for record in table.to_pylist():
+            raw = record.get("__raw__")
+            if raw is not None:
+                records.append((parse_line(raw), raw))
+                continue
+            absent = set(record.get("__absent__") or ())
+            row = {}
+            for key in info["keys"]:
+                if key in absent or key not in record:
+                    continue
+                value = record[key]
+                row[key] = json.loads(value) if key in json_columns else value
+            for key in record.get("__int_scores__") or ():
+                row[key]["judge_score"] = int(row[key]["judge_score"])
+            records.append((row, None))
+        return records
+
+    def rows(self, path: str) -> List[dict]:
+        """Rows of one original JSONL file, identical (values and types) to parsing that file."""
+        return [row for row, _ in self._records(path)]
+
+    def file_text(self, path: str) -> str:
+        """The original text of one JSONL file."""
+        info = self.file_info[path]
+        style = info.get("style", STYLES[1])
+        blank_lines = info.get("blank_lines", {})
+        records = iter(self._records(path))
+        lines = []
+        for number in range(info["rows"] + len(blank_lines)):
+            if str(number) in blank_lines:
+                lines.append(blank_lines[str(number)])
+                continue
+            row, raw = next(records)
+            lines.append(raw if raw is not None else dump_row(row, style))
+        text = "\n".join(lines) + ("\n" if info.get("final_newline", True) and lines else "")
+        return BOM + text if info["bom"] else text
+
+    def score_accumulators(self) -> Dict[Tuple[str, str], ScoreAccumulator]:
+        """Per (model, strategy) accumulators from the score columns only, without touching messages."""
+        import pyarrow.compute as pc
+
+        table = self.read(["category", "query_single.judge_score", "query_multi.judge_score"])
+        single = pc.struct_field(table["query_single"], "judge_score")
+        multi = pc.struct_field(table["query_multi"], "judge_score")
+        valid = pc.and_(pc.is_valid(single), pc.is_valid(multi))
+        table = table.filter(valid).select(["path", "category"])
+        table = table.append_column("single", single.filter(valid)).append_column("multi", multi.filter(valid))
+        totals = table.group_by(["path", "category"]).aggregate(
+            [("single", "sum"), ("multi", "sum"), ("single", "count")]
+        )
+
+        accumulators = {}
+        for path, category, single_sum, multi_sum, count in zip(*(column.to_pylist() for column in totals.columns)):
+            model, _, file_name = path.rpartition("/")
+            accumulator = accumulators.setdefault((model, file_name[: -len(".jsonl")]), ScoreAccumulator())
+            accumulator.categories[category] = [single_sum, multi_sum, count]
+        return accumulators
+
+
+def _string_array(values):
+    import pyarrow as pa
+
+    return pa.array(values, type=pa.string())
+
+
+def import_tree(store_path, dest_dir) -> int:
+    """Write every file of the store back to JSONL under `dest_dir`, byte for byte."""
+    store = ColumnarStore(store_path)
+    dest_dir = Path(dest_dir)
+    for path in store.files():
+        output_path = dest_dir / path
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_bytes(store.file_text(path).encode("utf-8"))
+    return len(store.files())
+
+
+def verify_tree(store_path, src_dir) -> int:
+    """Compare every file in the store with the JSONL tree it came from; returns the mismatch count.
+
+    A file matches when its bytes are identical and the parsed rows have the same values and types
+    (8 and 8.0 differ).
+    """
+    store = ColumnarStore(store_path)
+    mismatches = 0
+    source_files = dict((relative_path, file_path) for file_path, relative_path in iter_jsonl_files(src_dir))
+    for path in sorted(set(store.files()) | set(source_files)):
+        if (
+            path not in source_files
+            or path not in store.file_info
+            or source_files[path].read_bytes() != store.file_text(path).encode("utf-8")
+            or json.dumps(list(iter_rows(source_files[path]))) != json.dumps(store.rows(path))
+        ):
+            mismatches += 1
+            print(f"- 불일치 : {path}")
+    return mismatches
+
+
+@lru_cache(maxsize=None)
+def open_store(path) -> ColumnarStore:
+    return ColumnarStore(path)
+
+
+def find_store(file_path) -> Optional[Tuple[Path, str]]:
+    """(store, relative path) when `file_path` names a file inside a store, e.g. generated.parquet/model/default.jsonl."""
+    file_path = Path(file_path)
+    for parent in file_path.parents:
+        if parent.suffix == STORE_SUFFIX and parent.is_file():
+            return parent, file_path.relative_to(parent).as_posix()
+    return None
+
+
+def store_file_paths(store_path) -> List[Path]:
+    store_path = Path(store_path)
+    return [store_path / path for path in open_store(store_path).files()]
+
+
+def read_frame(file_path):
+    """pandas DataFrame of a JSONL file, or of the matching file inside a store."""
+    import pandas as pd
+
+    found = find_store(file_path)
+    if found is None:
+        return pd.read_json(file_path, lines=True)
+    store_path, relative_path = found
+    return pd.DataFrame(open_store(store_path).rows(relative_path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar (Parquet) storage for generated/evaluated outputs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Pack a JSONL tree into one Parquet store")
+    export_parser.add_argument("src_dir")
+    export_parser.add_argument("store")
+    export_parser.add_argument("--compression", default="zstd")
+    import_parser = subparsers.add_parser("import", help="Write a store back to a JSONL tree")
+    import_parser.add_argument("store")
+    import_parser.add_argument("dest_dir")
+    verify_parser = subparsers.add_parser("verify", help="Check a store against its source JSONL tree")
+    verify_parser.add_argument("store")
+    verify_parser.add_argument("src_dir")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        manifest = export_tree(args.src_dir, args.store, compression=args.compression)
+        n_rows = sum(entry["rows"] for entry in manifest["files"])
+        size = Path(args.store).stat().st_size
+        print(f"- {len(manifest['files'])} files, {n_rows} rows -> {args.store} ({size / 1024 / 1024:.1f} MB)")
+    elif args.command == "import":
+        print(f"- {import_tree(args.store, args.dest_dir)} files written to {args.dest_dir}")
+    elif args.command == "verify":
+        mismatches = verify_tree(args.store, args.src_dir)
+        print(f"- {mismatches} mismatched files")
+        raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
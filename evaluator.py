@@ -1,54 +1,146 @@
 import argparse
-import json
+import asyncio
+import hashlib
 import os
-import re
 import time
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
-from threading import Lock
 from typing import Dict, Union
 
-import pandas as pd
-from openai import AzureOpenAI, OpenAI
-
-from templates import JUDGE_TEMPLATE
+from columnar_store import read_frame, store_file_paths
+from judge_cache import JudgeCache
+from judge_parser import parse_judge_output
+from judge_plan import TURNS, JudgePlan
+from metrics import CURRENT_LABEL, METRICS
+from ratelimit import (
+    AdaptiveConcurrency,
+    AsyncAdaptiveConcurrency,
+    RateLimiter,
+    backoff_delay,
+    estimate_tokens,
+    is_throttle_error,
+)
+from result_writer import ResultWriter, load_completed_ids, repair_output_file
+from scheduler import WorkItemScheduler
+from templates import JUDGE_JSON_OUTPUT_FORMAT, JUDGE_TEMPLATE
 
 # Constants
 TIME_START = datetime.now().strftime("%Y%m%d_%H%M%S")
-LOCK = Lock()
+MAX_RETRIES = 4
+IMPOSSIBLE_ANSWER = {
+    "judge_message": "Impossible to judge due to repetition.",
+    "judge_score": 0.0,
+}
 
 AZURE_ENDPOINT = os.environ.get("AZURE_ENDPOINT", None)
 AZURE_DEPLOYMENT_NAME = os.environ.get("AZURE_DEPLOYMENT_NAME", None)
 AZURE_API_VERSION = os.environ.get("AZURE_API_VERSION", None)
-USE_AZURE_OPENAI = AZURE_ENDPOINT is not None and AZURE_DEPLOYMENT_NAME is not None and AZURE_API_VERSION is not None
 
 
-def get_args():
+def get_args(argv=None):
     parser = argparse.ArgumentParser()
-    parser.add_argument("-o", "--model-output-dir", help="Model Output Directory", required=True)
+    parser.add_argument(
+        "-o", "--model-output-dir", help="Model Output Directory (or a columnar store .parquet)", required=True
+    )
     parser.add_argument("-k", "--openai-api-key", help="OpenAI API Key", required=True)
     parser.add_argument("-j", "--judge-model", help="Judge Model", default="gpt-4-1106-preview")
-    parser.add_argument("-t", "--threads", help="Thread count", default=42, type=int)
+    parser.add_argument(
+        "--judges",
+        help="Ensemble mode: judge specs MODEL[,base_url=..,api_key=..,rpm=..,tpm=..,concurrency=..] (replaces -j)",
+        nargs="+",
+        default=None,
+    )
+    parser.add_argument(
+        "--ensemble-aggregate", help="How ensemble scores are combined", choices=["mean", "median"], default="mean"
+    )
+    parser.add_argument(
+        "-t", "--threads", help="Thread count (initial concurrency with --adaptive)", default=42, type=int
+    )
+    parser.add_argument(
+        "--adaptive", help="Adapt in-flight judge requests to 429/5xx responses (AIMD)", action="store_true"
+    )
+    parser.add_argument("--max-threads", help="Upper bound on concurrency with --adaptive", default=256, type=int)
     parser.add_argument("--azure", help="Use Azure OpenAI", action="store_true")
-    return parser.parse_args()
+    parser.add_argument("--base-url", help="OpenAI-compatible API base URL (e.g. mock_server.py)", default=None)
+    parser.add_argument(
+        "--async", dest="use_async", help="Judge all files concurrently with the asyncio engine", action="store_true"
+    )
+    parser.add_argument("--rpm", help="Requests per minute limit (async engine)", default=None, type=int)
+    parser.add_argument("--tpm", help="Tokens per minute limit (async engine)", default=None, type=int)
+    parser.add_argument("--cache-path", help="Judge result cache (SQLite)", default="./judge_cache.sqlite3")
+    parser.add_argument("--no-cache", help="Disable the judge result cache", action="store_true")
+    parser.add_argument("--resume", help="Judge only rows missing from existing output files", action="store_true")
+    parser.add_argument("--batch", help="Judge through the OpenAI Batch API", action="store_true")
+    parser.add_argument("--batch-dir", help="Directory for batch JSONL shards", default="./batch")
+    parser.add_argument("--batch-poll-interval", help="Seconds between batch status polls", default=60, type=float)
+    parser.add_argument(
+        "--queue",
+        help="Coordinate through a SQLite work queue shared with `work_queue.py` workers (-t local threads, 0 = none)",
+        default=None,
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        help="Work queue lease; unfinished tasks return to the queue after it",
+        default=300,
+        type=float,
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        help="Flag answers nearly identical to one already judged in ./evaluated, or reuse that judgement",
+        choices=["flag", "reuse"],
+        default=None,
+    )
+    parser.add_argument(
+        "--similarity-threshold", help="MinHash similarity for --near-duplicates", default=0.95, type=float
+    )
+    parser.add_argument(
+        "--judge-format",
+        help="Ask the judge for free text or a JSON object (structured output)",
+        choices=["text", "json"],
+        default="text",
+    )
+    parser.add_argument("--metrics-file", help="Append per-request judge metrics (JSONL)", default=None)
+    parser.add_argument("--prometheus-file", help="Write a Prometheus textfile with run totals", default=None)
+    parser.add_argument("--price-prompt", help="USD per 1M prompt tokens (cost report)", default=0.0, type=float)
+    parser.add_argument(
+        "--price-completion", help="USD per 1M completion tokens (cost report)", default=0.0, type=float
+    )
+    return parser.parse_args(argv)
+
 
+def create_openai_client(api_key: str, base_url=None):
+    from openai import OpenAI
 
-def create_openai_client(api_key: str):
-    return OpenAI(api_key=api_key)
+    # 재시도는 create_answers 에서 직접 처리해 429 를 동시 실행 제어에 반영
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
 
 
 def create_azure_openai_client(api_key: str):
+    from openai import AzureOpenAI
+
     return AzureOpenAI(
         azure_endpoint=AZURE_ENDPOINT,
         api_key=api_key,
         api_version=AZURE_API_VERSION,
+        max_retries=0,
     )
 
 
-def create_answers(
-    client, model_output, judge_model, is_multi_turn: bool = False, i=0
-) -> Dict[str, Union[str, float]]:
+def create_async_client(api_key: str, azure: bool = False, base_url=None):
+    from openai import AsyncAzureOpenAI, AsyncOpenAI
+
+    if azure:
+        return AsyncAzureOpenAI(
+            azure_endpoint=AZURE_ENDPOINT,
+            api_key=api_key,
+            api_version=AZURE_API_VERSION,
+            max_retries=0,
+        )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+def build_judge_prompt(model_output, is_multi_turn: bool = False) -> str:
     model_questions = model_output["questions"]
     model_outputs = model_output["outputs"]
     model_references = model_output["references"]
@@ -70,112 +162,446 @@ def create_answers(
         prompt += f"\n\n**Model's Response**\n{model_outputs[1]}"
 
     prompt += "\n\n[[대화 종료. 평가 시작.]]"
+    return prompt
+
+
+def judge_template(is_multi_turn: bool = False, judge_format: str = "text"):
+    """Return the (cache name, system prompt) pair for a judge call."""
+    template_name = "multi_turn" if is_multi_turn else "single_turn"
+    template = JUDGE_TEMPLATE[template_name]
+    if judge_format == "json":
+        template = template[: template.index("# 출력 형식")] + JUDGE_JSON_OUTPUT_FORMAT
+        template_name += "_json"
+    return template_name, template
+
+
+def judge_identity(judge_model, judge_format: str = "text") -> dict:
+    """Judge model and a digest of its templates, stored with every judged row as `judge`."""
+    templates = "\0".join(judge_template(turn == "multi", judge_format)[1] for turn in TURNS)
+    return {"model": judge_model, "template": hashlib.sha256(templates.encode("utf-8")).hexdigest()[:16]}
+
+
+def resolve_judge_model(judge_model, azure: bool = False):
+    # Azure 는 모델 이름 대신 deployment 이름으로 호출
+    return AZURE_DEPLOYMENT_NAME if azure and AZURE_DEPLOYMENT_NAME else judge_model
+
+
+def build_judge_request(prompt: str, judge_model, is_multi_turn: bool = False, judge_format: str = "text") -> dict:
+    request = {
+        "model": judge_model,
+        "temperature": 0.0,
+        "n": 1,
+        "messages": [
+            {"role": "system", "content": judge_template(is_multi_turn, judge_format)[1]},
+            {"role": "user", "content": prompt},
+        ],
+    }
+    if judge_format == "json":
+        request["response_format"] = {"type": "json_object"}
+    return request
+
+
+def record_judge_metrics(start: float, attempt: int, response=None, error=None):
+    METRICS.record_usage(
+        "judge",
+        time.perf_counter() - start,
+        getattr(response, "usage", None),
+        ok=error is None,
+        attempt=attempt,
+        error=None if error is None else repr(error)[:200],
+        # 응답은 받았지만 점수를 찾지 못한 경우
+        parse_failure=response is not None and isinstance(error, ValueError),
+    )
 
-    try:
-        if USE_AZURE_OPENAI:  # azure
-            response = client.chat.completions.create(
-                model=AZURE_DEPLOYMENT_NAME,
-                temperature=0.0,
-                n=1,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": JUDGE_TEMPLATE["multi_turn" if is_multi_turn else "single_turn"],
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-            )
-        else:  # openai api
-            response = client.chat.completions.create(
-                model=judge_model,
-                temperature=0.0,
-                n=1,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": JUDGE_TEMPLATE["multi_turn" if is_multi_turn else "single_turn"],
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-            )
 
-        content = response.choices[0].message.content
-        judge_message_match = re.search(r"평가:(.*?)점수:", content.replace("*", ""), re.DOTALL)
-        judge_message = judge_message_match.group(1).strip() if judge_message_match else "No judge message found"
-        judge_score_match = re.search(r"점수:\s*(\d+(\.\d+)?)", content.replace("*", ""))
-        if judge_score_match:
-            judge_score = float(judge_score_match.group(1))
-        else:
-            raise ValueError("No score found in response")
+def create_answers(
+    client,
+    model_output,
+    judge_model,
+    is_multi_turn: bool = False,
+    concurrency: AdaptiveConcurrency = None,
+    judge_format: str = "text",
+) -> Dict[str, Union[str, float]]:
+    prompt = build_judge_prompt(model_output, is_multi_turn)
+    return judge_prompt(client, prompt, judge_model, is_multi_turn, concurrency, judge_format)
 
-        return {"judge_message": judge_message, "judge_score": judge_score}
 
-    except Exception as e:
-        print("Error. Retrying after 20 sec", e)
-        time.sleep(20)
+def judge_prompt(
+    client,
+    prompt: str,
+    judge_model,
+    is_multi_turn: bool = False,
+    concurrency: AdaptiveConcurrency = None,
+    judge_format: str = "text",
+) -> Dict[str, Union[str, float]]:
+    request = build_judge_request(prompt, judge_model, is_multi_turn, judge_format)
+
+    for i in range(MAX_RETRIES + 1):
+        # 재시도 대기 중에는 동시 실행 슬롯을 반납해 다른 요청이 진행되도록 함
+        with concurrency.slot() if concurrency else nullcontext():
+            start = time.perf_counter()
+            sent_at = time.monotonic()
+            response = None
+            try:
+                response = client.chat.completions.create(**request)
+                answer = parse_judge_output(response.choices[0].message.content)
+                record_judge_metrics(start, i, response)
+                if concurrency:
+                    concurrency.on_success()
+                return answer
+            except Exception as e:
+                record_judge_metrics(start, i, response, e)
+                if concurrency and is_throttle_error(e):
+                    concurrency.on_throttle(sent_at)
+                error = e
 
         # 꼭 아래 이유가 아닐 수 있음. 핸들링 필요.
-        if i > 3:
-            print("Impossible prompt, aborting..!")
-            return {
-                "judge_message": "Impossible to judge due to repetition.",
-                "judge_score": 0.0,
-            }
-        i += 1
-        return create_answers(client, model_output, judge_model, is_multi_turn, i)
+        if i == MAX_RETRIES:
+            break
+        delay = backoff_delay(i, error)
+        print(f"Error. Retrying after {delay:.1f} sec", error)
+        time.sleep(delay)
+
+    print("Impossible prompt, aborting..!")
+    return IMPOSSIBLE_ANSWER.copy()
+
+
+async def create_answers_async(
+    client,
+    model_output,
+    judge_model,
+    limiter: RateLimiter,
+    concurrency: AsyncAdaptiveConcurrency,
+    is_multi_turn: bool = False,
+    judge_format: str = "text",
+) -> Dict[str, Union[str, float]]:
+    prompt = build_judge_prompt(model_output, is_multi_turn)
+    return await judge_prompt_async(client, prompt, judge_model, limiter, concurrency, is_multi_turn, judge_format)
+
+
+async def judge_prompt_async(
+    client,
+    prompt: str,
+    judge_model,
+    limiter: RateLimiter,
+    concurrency: AsyncAdaptiveConcurrency,
+    is_multi_turn: bool = False,
+    judge_format: str = "text",
+) -> Dict[str, Union[str, float]]:
+    request = build_judge_request(prompt, judge_model, is_multi_turn, judge_format)
+    estimated_tokens = estimate_tokens(*(message["content"] for message in request["messages"]))
+
+    for i in range(MAX_RETRIES + 1):
+        # 재시도 대기 중에는 동시 실행 슬롯을 반납해 다른 요청이 진행되도록 함
+        async with concurrency:
+            await limiter.acquire(estimated_tokens)
+            start = time.perf_counter()
+            sent_at = time.monotonic()
+            response = None
+            try:
+                response = await client.chat.completions.create(**request)
+                usage = getattr(response, "usage", None)
+                limiter.record_usage(estimated_tokens, usage.total_tokens if usage else None)
+                answer = parse_judge_output(response.choices[0].message.content)
+                record_judge_metrics(start, i, response)
+                concurrency.on_success()
+                return answer
+            except Exception as e:
+                record_judge_metrics(start, i, response, e)
+                if is_throttle_error(e):
+                    concurrency.on_throttle(sent_at)
+                error = e
+
+        if i == MAX_RETRIES:
+            break
+        delay = backoff_delay(i, error)
+        print(f"Error. Retrying after {delay:.1f} sec", error)
+        await asyncio.sleep(delay)
+
+    print("Impossible prompt, aborting..!")
+    return IMPOSSIBLE_ANSWER.copy()
+
+
+def prompt_cache_key(prompt: str, judge_model, is_multi_turn: bool = False, judge_format: str = "text") -> str:
+    template_name, template = judge_template(is_multi_turn, judge_format)
+    return JudgeCache.make_key(judge_model, template_name, template, prompt)
+
+
+def cached_judge_prompt(
+    client, prompt: str, key: str, judge_model, cache, is_multi_turn=False, concurrency=None, judge_format="text"
+):
+    answer = cache.get(key) if cache is not None else None
+    if answer is None:
+        answer = judge_prompt(client, prompt, judge_model, is_multi_turn, concurrency, judge_format)
+        # 평가 불가 결과는 캐시하지 않아 다음 실행에서 다시 시도되도록 함
+        if cache is not None and answer != IMPOSSIBLE_ANSWER:
+            cache.put(key, answer)
+    return answer
+
+
+async def cached_judge_prompt_async(
+    client, prompt: str, key: str, judge_model, limiter, concurrency, cache, is_multi_turn=False, judge_format="text"
+):
+    answer = cache.get(key) if cache is not None else None
+    if answer is None:
+        answer = await judge_prompt_async(
+            client, prompt, judge_model, limiter, concurrency, is_multi_turn, judge_format
+        )
+        if cache is not None and answer != IMPOSSIBLE_ANSWER:
+            cache.put(key, answer)
+    return answer
+
+
+def create_judge_plan(judge_model, judge_format: str = "text") -> JudgePlan:
+    return JudgePlan(
+        build_prompt=lambda row, turn: build_judge_prompt(row, turn == "multi"),
+        make_key=lambda prompt, turn: prompt_cache_key(prompt, judge_model, turn == "multi", judge_format),
+        judge_id=judge_identity(judge_model, judge_format),
+    )
 
 
-def process_item(client, row, judge_model, output_file):
-    query_single = create_answers(client, row, judge_model)
-    query_multi = create_answers(client, row, judge_model, is_multi_turn=True)
+def judge_turn(client, plan: JudgePlan, label: str, row, turn: str, args, cache=None, concurrency=None):
+    key, prompt = plan.lookup(label, row["id"], turn)
+    return plan.judge(
+        key,
+        lambda: cached_judge_prompt(
+            client, prompt, key, args.judge_model, cache, turn == "multi", concurrency, args.judge_format
+        ),
+    )
+
+
+def write_judged_row(row, answers, output_file, writer):
+    row["query_single"] = answers["single"]
+    row["query_multi"] = answers["multi"]
+    writer.write(output_file, row)
+
+
+def load_pending_rows(file_path: Path, output_file: Path, resume: bool):
+    df_model_outputs = read_frame(file_path)
+    if resume:
+        completed_ids = repair_output_file(output_file)
+        df_model_outputs = df_model_outputs[~df_model_outputs["id"].isin(completed_ids)]
+    return df_model_outputs
+
+
+def load_near_duplicates(args, output_dir: Path):
+    if not args.near_duplicates:
+        return None
+    from answer_index import NearDuplicates, build_index
+
+    return NearDuplicates(build_index(output_dir, args.similarity_threshold), reuse=args.near_duplicates == "reuse")
+
+
+def prepare_files(json_files, input_dir: Path, output_dir: Path, resume: bool, plan: JudgePlan, near_duplicates=None):
+    """Load the pending rows of every file and precompile their judge prompts into `plan`."""
+    prepared = []
+    for file_path in json_files:
+        label = file_path.relative_to(input_dir).as_posix()
+        output_file = output_dir / label
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        rows = load_pending_rows(file_path, output_file, resume).to_dict(orient="records")
+        if not rows:
+            print(f"이미 평가 완료.. : {file_path}")
+            continue
+        plan.add_rows(label, rows)
+        if plan.judge_id is not None:
+            # 출력 형식에 추가되는 필드 (README 참고). 어떤 judge 와 템플릿으로 평가했는지 남겨
+            # 이후 실행의 유사 답변 재사용이 같은 judge 의 평가만 쓰도록 함
+            for row in rows:
+                row["judge"] = plan.judge_id
+        if near_duplicates is not None:
+            near_duplicates.apply(plan, label, output_file.relative_to(output_dir).as_posix(), rows)
+        prepared.append((file_path, output_file, label, rows))
+    print(plan.summary())
+    if near_duplicates is not None:
+        print(near_duplicates.summary())
+    return prepared
+
+
+def process_file(client, prepared_file, plan: JudgePlan, threads: int, args, writer, cache=None, concurrency=None):
+    file_path, output_file, label, rows = prepared_file
+    print(f"- 현재 Processing : {file_path} ({len(rows)} rows)")
+
+    def judge_fn(row, turn):
+        CURRENT_LABEL.set(label)
+        return judge_turn(client, plan, label, row, turn, args, cache, concurrency)
+
+    # single/multi turn 을 독립 작업으로 스케줄링하고, 두 결과가 모이면 바로 기록
+    scheduler = WorkItemScheduler(
+        judge_fn=judge_fn,
+        on_row_done=lambda row, answers: write_judged_row(row, answers, output_file, writer),
+        threads=threads,
+    )
+    scheduler.run(enumerate(rows))
+
+
+async def process_item_async(client, row, label, output_file, plan, limiter, concurrency, args, writer, cache=None):
+    async def judge(turn):
+        key, prompt = plan.lookup(label, row["id"], turn)
+        return await plan.judge_async(
+            key,
+            lambda: cached_judge_prompt_async(
+                client,
+                prompt,
+                key,
+                args.judge_model,
+                limiter,
+                concurrency,
+                cache,
+                turn == "multi",
+                args.judge_format,
+            ),
+        )
+
+    query_single, query_multi = await asyncio.gather(judge("single"), judge("multi"))
 
     row["query_single"] = query_single
     row["query_multi"] = query_multi
-    row = row.to_dict()
+    writer.write(output_file, row)
 
-    with LOCK:
-        with output_file.open("a", encoding="utf-8-sig") as f:
-            f.write(json.dumps(row, ensure_ascii=False))
-            f.write("\n")
 
+async def process_file_async(client, prepared_file, plan, limiter, concurrency, args, writer, cache=None):
+    file_path, output_file, label, rows = prepared_file
+    print(f"- 현재 Processing : {file_path} ({len(rows)} rows)")
 
-def process_file(client, file_path: Path, output_dir: Path, judge_model, threads: int, args):
-    print(f"- 현재 Processing : {file_path}")
-    df_model_outputs = pd.read_json(file_path, lines=True)
+    # gather 로 만들어지는 태스크들이 이 라벨을 물려받음
+    CURRENT_LABEL.set(label)
+    await asyncio.gather(
+        *(
+            process_item_async(client, row, label, output_file, plan, limiter, concurrency, args, writer, cache)
+            for row in rows
+        )
+    )
 
-    output_file = output_dir / file_path.relative_to(args.model_output_dir)
-    output_file.parent.mkdir(parents=True, exist_ok=True)
 
-    with ThreadPoolExecutor(max_workers=threads) as executor:
-        for row in df_model_outputs.iterrows():
-            executor.submit(process_item, client, row[1], judge_model, output_file)
+async def main_async(args, prepared_files, plan: JudgePlan, writer, cache=None):
+    client = create_async_client(args.openai_api_key, azure=args.azure, base_url=args.base_url)
+    # 모든 파일이 하나의 동시 실행 한도와 RPM/TPM 예산을 공유
+    limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+    concurrency = AsyncAdaptiveConcurrency(args.threads, args.max_threads, adaptive=args.adaptive)
+
+    try:
+        await asyncio.gather(
+            *(
+                process_file_async(client, prepared_file, plan, limiter, concurrency, args, writer, cache)
+                for prepared_file in prepared_files
+            )
+        )
+    finally:
+        # 이벤트 루프가 닫힌 뒤 연결 정리가 실행되지 않도록 루프 안에서 client 를 닫음
+        await client.close()
+    if args.adaptive:
+        print(f"- Adaptive concurrency : final limit {int(concurrency.limit)}")
+
+
+def count_missing_rows(file_path: Path, output_file: Path) -> int:
+    return len(set(read_frame(file_path)["id"]) - load_completed_ids(output_file))
+
+
+def report_incomplete_files(json_files, input_dir: Path, output_dir: Path):
+    for file_path in json_files:
+        n_missing = count_missing_rows(file_path, output_dir / file_path.relative_to(input_dir))
+        if n_missing:
+            print(f"평가 미완료 ({n_missing}개 누락, --resume 으로 재개) : {file_path}")
 
 
 def is_hidden(filepath: Path) -> bool:
     return any(part.startswith(".") for part in filepath.parts)
 
 
-def main():
-    args = get_args()
-    if args.azure:
-        client = create_azure_openai_client(args.openai_api_key)
-    else:
-        client = create_openai_client(args.openai_api_key)
+def main(argv=None):
+    args = get_args(argv)
+    # 앙상블 judge 는 각 spec 의 모델(또는 deployment) 이름을 그대로 사용
+    args.judge_model = resolve_judge_model(args.judge_model, args.azure)
 
     input_dir = Path(args.model_output_dir)
     output_dir = Path("./evaluated")
 
-    # Filter out hidden files
-    json_files = [file for file in input_dir.rglob("*.jsonl") if not is_hidden(file)]
+    if input_dir.is_file():
+        # 컬럼 저장소의 각 파일은 <store>.parquet/<model>/<strategy>.jsonl 경로로 다룸
+        json_files = store_file_paths(input_dir)
+    else:
+        # Filter out hidden files
+        json_files = [file for file in input_dir.rglob("*.jsonl") if not is_hidden(file)]
     print(f"Found {len(json_files)} JSON files to process")
 
+    pending_files = []
     for file_path in json_files:
         output_file_path = output_dir / file_path.relative_to(input_dir)
-        if output_file_path.exists():
-            print(f"이미 평가 완료.. : {file_path}")
+        # --resume 모드에서는 기존 출력 파일이 있어도 빠진 행이 있는지 다시 확인
+        if output_file_path.exists() and not args.resume:
+            # 중단되어 행이 빠진 기존 파일은 건너뛰더라도 알려줌
+            n_missing = count_missing_rows(file_path, output_file_path)
+            if n_missing:
+                print(f"평가 미완료 파일 건너뜀 ({n_missing}개 누락, --resume 으로 재개) : {file_path}")
+            else:
+                print(f"이미 평가 완료.. : {file_path}")
             continue
-        process_file(client, file_path, output_dir, args.judge_model, args.threads, args)
-        time.sleep(20)  # to handle ratelimit!
+        pending_files.append(file_path)
+
+    cache = None if args.no_cache else JudgeCache(args.cache_path)
+    writer = ResultWriter()
+    METRICS.configure(args.metrics_file, price_prompt=args.price_prompt, price_completion=args.price_completion)
+
+    try:
+        if args.judges:
+            from judge_ensemble import run_ensemble
+
+            asyncio.run(run_ensemble(args, pending_files, input_dir, output_dir, writer, cache))
+        elif args.use_async:
+            plan = create_judge_plan(args.judge_model, args.judge_format)
+            prepared_files = prepare_files(
+                pending_files, input_dir, output_dir, args.resume, plan, load_near_duplicates(args, output_dir)
+            )
+            asyncio.run(main_async(args, prepared_files, plan, writer, cache))
+        else:
+            if args.azure:
+                client = create_azure_openai_client(args.openai_api_key)
+            else:
+                client = create_openai_client(args.openai_api_key, base_url=args.base_url)
+
+            if args.batch:
+                from judge_batch import run_batch
+
+                run_batch(client, pending_files, input_dir, output_dir, args, writer, cache)
+            elif args.queue:
+                from work_queue import run_coordinator
+
+                run_coordinator(client, pending_files, input_dir, output_dir, args, writer, cache)
+            else:
+                plan = create_judge_plan(args.judge_model, args.judge_format)
+                prepared_files = prepare_files(
+                    pending_files, input_dir, output_dir, args.resume, plan, load_near_duplicates(args, output_dir)
+                )
+
+                # 파일 사이 고정 대기 대신 재시도 backoff 와 동시 실행 제어가 rate limit 을 처리
+                concurrency = None
+                threads = args.threads
+                if args.adaptive:
+                    concurrency = AdaptiveConcurrency(args.threads, args.max_threads)
+                    threads = concurrency.max_limit
+                for prepared_file in prepared_files:
+                    process_file(client, prepared_file, plan, threads, args, writer, cache, concurrency)
+                if concurrency:
+                    print(f"- Adaptive concurrency : final limit {int(concurrency.limit)}")
+    finally:
+        writer.close()
+        METRICS.close()
+
+    report_incomplete_files(pending_files, input_dir, output_dir)
+    if args.judges:
+        from judge_ensemble import iter_judge_scores, print_agreement
+
+        # 이번 실행이 쓴 출력 파일만 집계
+        output_files = [output_dir / file_path.relative_to(input_dir) for file_path in pending_files]
+        print_agreement(iter_judge_scores(output_dir, output_files))
+
+    summary = METRICS.summary()
+    if summary:
+        print(summary)
+    if args.prometheus_file:
+        METRICS.write_prometheus(args.prometheus_file)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,434 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from generation_checkpoint import GenerationCheckpoint
+from generation_scheduler import FakeEngine, PipelinedGenerator, VLLMEngine, with_max_tokens
+from metrics import CURRENT_LABEL, METRICS
+from ratelimit import SyncRateLimiter, backoff_delay
+
+MAX_RETRIES = 6
+STOP_TOKENS = ["<|endoftext|>", "[INST]", "[/INST]", "<|im_end|>", "<|end|>", "<|eot_id|>", "<end_of_turn>", "<eos>"]
+
+GEMINI_SAFETY_SETTINGS = {
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+}
+
+
+def single_turn_messages(prompts, question):
+    return prompts + [{"role": "user", "content": question[0]}]
+
+
+def multi_turn_messages(prompts, question, single_turn_output):
+    return prompts + [
+        {"role": "user", "content": question[0]},
+        {"role": "assistant", "content": single_turn_output},
+        {"role": "user", "content": question[1]},
+    ]
+
+
+def format_plain_messages(messages):
+    return "\n".join([f"{message['role']}: {message['content']}" for message in messages])
+
+
+class Backend:
+    """Base adapter. Subclasses declare what the scheduler may use:
+
+    - supports_batching: `generate_batch(prompts)` runs many prompts in one call
+    - supports_streaming: `step_engine()` reports requests as they finish (add_request/step)
+    - max_concurrency / rpm: limits for backends driven one `complete(prompt)` call at a time
+    """
+
+    name = "base"
+    supports_batching = False
+    supports_streaming = False
+    max_concurrency = 1
+    rpm = None
+
+    def format_messages(self, messages):
+        return format_plain_messages(messages)
+
+    def complete(self, prompt) -> str:
+        raise NotImplementedError
+
+    def generation_params(self) -> dict:
+        """Settings that change the output of `complete`; part of the checkpoint key."""
+        return {"backend": self.name}
+
+    def generate_batch(self, prompts, categories=None) -> List[str]:
+        raise NotImplementedError
+
+    def step_engine(self):
+        raise NotImplementedError
+
+    def capabilities(self) -> dict:
+        return {
+            "backend": self.name,
+            "batching": self.supports_batching,
+            "streaming": self.supports_streaming,
+            "max_concurrency": self.max_concurrency,
+            "rpm": self.rpm,
+        }
+
+
+class VLLMBackend(Backend):
+    name = "vllm"
+    supports_batching = True
+    supports_streaming = True
+
+    def __init__(
+        self,
+        model: str,
+        gpu_devices: str = "0",
+        model_len: int = 4096,
+        prefix_caching: bool = False,
+        category_caps: Optional[Dict[str, int]] = None,
+    ):
+        os.environ["CUDA_VISIBLE_DEVICES"] = gpu_devices
+
+        # Use aphrodite-engine or vLLM
+        try:
+            from aphrodite import LLM, SamplingParams
+
+            print("- Using aphrodite-engine")
+
+        except ImportError:
+            from vllm import LLM, SamplingParams
+
+            print("- Using vLLM")
+
+        self.llm = LLM(
+            model=model,
+            tensor_parallel_size=len(gpu_devices.split(",")),
+            max_model_len=model_len,
+            gpu_memory_utilization=0.8,
+            trust_remote_code=True,  # !
+            # few-shot/system 프롬프트 prefix 를 전략 간에 재사용
+            **({"enable_prefix_caching": True} if prefix_caching else {}),
+        )
+        self.sampling_params = SamplingParams(
+            temperature=0,
+            skip_special_tokens=True,
+            max_tokens=model_len,
+            stop=STOP_TOKENS,
+        )
+
+        # category_caps (기본 상한을 덮어쓸 값) 가 주어지면 요청마다 남은 컨텍스트와 카테고리 상한으로 max_tokens 를 정함
+        self.planner = None
+        if category_caps is not None:
+            from token_planner import TokenBudgetPlanner, default_category_caps
+
+            tokenizer = self.llm.get_tokenizer()
+
+            def count_tokens(text):
+                # 프롬프트는 chat template 으로 BOS 가 이미 들어 있으므로 special token 을 다시 붙이지 않음
+                return len(tokenizer(text, add_special_tokens=False).input_ids)
+
+            caps = {**default_category_caps(count_tokens), **category_caps}
+            self.planner = TokenBudgetPlanner(count_tokens, model_len, caps)
+
+    def format_messages(self, messages):
+        return self.llm.llm_engine.tokenizer.tokenizer.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
+        )
+
+    def generate_batch(self, prompts, categories=None) -> List[str]:
+        start = time.perf_counter()
+        if self.planner is None:
+            outputs = self.llm.generate(prompts, self.sampling_params)
+        else:
+            # 길이 구간 순으로 제출하고 결과는 원래 순서로 되돌림
+            order, max_tokens = self.planner.plan_batch(prompts, categories)
+            sorted_outputs = self.llm.generate(
+                [prompts[i] for i in order], [with_max_tokens(self.sampling_params, max_tokens[i]) for i in order]
+            )
+            outputs = [None] * len(prompts)
+            for i, output in zip(order, sorted_outputs):
+                outputs[i] = output
+                self.planner.record_finish(output.outputs[0].finish_reason == "length")
+        # 배치 단위 호출이므로 지연 시간은 배치 전체 기준으로 한 번 기록
+        METRICS.record(
+            "generation",
+            time.perf_counter() - start,
+            prompt_tokens=sum(len(output.prompt_token_ids or []) for output in outputs),
+            completion_tokens=sum(len(output.outputs[0].token_ids) for output in outputs),
+        )
+        return [output.outputs[0].text.strip() for output in outputs]
+
+    def step_engine(self):
+        return VLLMEngine(self.llm, self.sampling_params, self.planner)
+
+
+class GeminiBackend(Backend):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str = "gemini-1.5-pro-001", concurrency: int = 1, rpm: int = None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model
+        self.model = genai.GenerativeModel(model)
+        self.max_concurrency = concurrency
+        self.rpm = rpm
+        self.rate_limiter = SyncRateLimiter(rpm)
+
+    def generation_params(self) -> dict:
+        return {"backend": self.name, "model": self.model_name, "safety_settings": GEMINI_SAFETY_SETTINGS}
+
+    def complete(self, input_text) -> str:
+        for i in range(MAX_RETRIES + 1):
+            try:
+                return self._call_gemini_api(input_text, attempt=i)
+            except Exception as e:
+                if i == MAX_RETRIES:
+                    raise
+                # OpenAI 백엔드와 같은 jitter 를 준 지수 backoff 로 재시도
+                delay = backoff_delay(i, e)
+                print(f"Error. Retrying after {delay:.1f} sec", e)
+                time.sleep(delay)
+
+    def _call_gemini_api(self, input_text, attempt: int = 0):
+        """Function to call the Gemini API and return the generated text."""
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = self.model.generate_content([input_text], safety_settings=GEMINI_SAFETY_SETTINGS)
+        except Exception as e:
+            METRICS.record("generation", time.perf_counter() - start, ok=False, attempt=attempt, error=repr(e)[:200])
+            raise
+        latency = time.perf_counter() - start
+
+        usage = getattr(response, "usage_metadata", None)
+        tokens = {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None),
+        }
+        if not response.candidates:
+            METRICS.record("generation", latency, ok=False, attempt=attempt, error="no candidates", **tokens)
+            raise ValueError("Invalid operation: No candidates returned in the response.")
+
+        candidate = response.candidates[0]
+        if not candidate.content.parts:
+            print(candidate)
+            METRICS.record("generation", latency, ok=False, attempt=attempt, error="no parts", **tokens)
+            raise ValueError("Invalid operation: No parts found in the candidate.")
+
+        METRICS.record("generation", latency, attempt=attempt, **tokens)
+        return candidate.content.parts[0].text
+
+
+class OpenAIBackend(Backend):
+    """Any OpenAI-compatible chat completions endpoint (OpenAI, vLLM/aphrodite server, mock_server.py, ...)."""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: Optional[str] = None,
+        concurrency: int = 8,
+        rpm: int = None,
+        max_tokens: Optional[int] = None,
+    ):
+        from openai import OpenAI
+
+        # 재시도는 complete 의 backoff 루프에서 처리
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_concurrency = concurrency
+        self.rpm = rpm
+        self.rate_limiter = SyncRateLimiter(rpm)
+
+    def format_messages(self, messages):
+        return messages
+
+    def generation_params(self) -> dict:
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "base_url": str(self.client.base_url),
+            "temperature": 0.0,
+            "max_tokens": self.max_tokens,
+        }
+
+    def complete(self, prompt) -> str:
+        for i in range(MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=prompt,
+                    temperature=0.0,
+                    n=1,
+                    **({"max_tokens": self.max_tokens} if self.max_tokens else {}),
+                )
+            except Exception as e:
+                METRICS.record("generation", time.perf_counter() - start, ok=False, attempt=i, error=repr(e)[:200])
+                if i == MAX_RETRIES:
+                    raise
+                # 429 의 Retry-After 를 지키면서 jitter 를 준 지수 backoff 로 재시도
+                delay = backoff_delay(i, e)
+                print(f"Error. Retrying after {delay:.1f} sec", e)
+                time.sleep(delay)
+                continue
+            METRICS.record_usage("generation", time.perf_counter() - start, response.usage, attempt=i)
+            return response.choices[0].message.content.strip()
+
+
+class FakeBackend(Backend):
+    """Deterministic local backend for exercising the scheduler without a GPU or API key."""
+
+    name = "fake"
+
+    def __init__(self, batching: bool = True, streaming: bool = True, concurrency: int = 4, batch_size: int = 16):
+        self.supports_batching = batching
+        self.supports_streaming = streaming
+        self.max_concurrency = concurrency
+        self.batch_size = batch_size
+
+    def complete(self, prompt) -> str:
+        return f"fake answer #{len(prompt)}"
+
+    def generate_batch(self, prompts, categories=None) -> List[str]:
+        return [self.complete(prompt) for prompt in prompts]
+
+    def step_engine(self):
+        return FakeEngine(batch_size=self.batch_size, respond=self.complete)
+
+
+class GenerationEngine:
+    """Drives any `Backend` at its best throughput.
+
+    Streaming backends get the pipelined scheduler (every strategy in one queue, multi turn queued
+    per question), batching backends get one batch per strategy and turn, and everything else runs
+    on a thread pool bounded by the backend's concurrency and rate limits, optionally checkpointed.
+    """
+
+    def __init__(self, backend: Backend, pipelined: bool = True, checkpoint: Optional[GenerationCheckpoint] = None):
+        self.backend = backend
+        self.pipelined = pipelined
+        self.checkpoint = checkpoint
+
+    def run(self, questions: List[dict], strategies: Dict[str, list]) -> Dict[str, tuple]:
+        if self.backend.supports_streaming and self.pipelined:
+            return PipelinedGenerator(self.backend.step_engine(), self.backend.format_messages).run(
+                questions, strategies
+            )
+        if self.backend.supports_batching:
+            return self._run_batched(questions, strategies)
+        return self._run_concurrent(questions, strategies)
+
+    def _run_batched(self, questions, strategies):
+        format_messages = self.backend.format_messages
+        results = {}
+        for strategy_name, prompts in strategies.items():
+            CURRENT_LABEL.set(strategy_name)
+            single_turn_prompts = [format_messages(single_turn_messages(prompts, q["questions"])) for q in questions]
+            print(single_turn_prompts[0])
+            categories = [q["category"] for q in questions]
+            single_turn_outputs = self.backend.generate_batch(single_turn_prompts, categories)
+
+            multi_turn_prompts = [
+                format_messages(multi_turn_messages(prompts, q["questions"], output))
+                for q, output in zip(questions, single_turn_outputs)
+            ]
+            multi_turn_outputs = self.backend.generate_batch(multi_turn_prompts, categories)
+            results[strategy_name] = (single_turn_outputs, multi_turn_outputs)
+        return results
+
+    def _generate_question(self, strategy_name, prompts, question_id, question):
+        """Generate both turns for one question, skipping any turn already in the checkpoint."""
+        format_messages = self.backend.format_messages
+        checkpoint = self.checkpoint
+        CURRENT_LABEL.set(strategy_name)
+
+        single_turn_prompt = format_messages(single_turn_messages(prompts, question))
+        single_turn_output = (
+            checkpoint.get(strategy_name, question_id, "single", single_turn_prompt) if checkpoint else None
+        )
+        if single_turn_output is None:
+            single_turn_output = self.backend.complete(single_turn_prompt)
+            if checkpoint:
+                checkpoint.put(strategy_name, question_id, "single", single_turn_prompt, single_turn_output)
+
+        multi_turn_prompt = format_messages(multi_turn_messages(prompts, question, single_turn_output))
+        multi_turn_output = (
+            checkpoint.get(strategy_name, question_id, "multi", multi_turn_prompt) if checkpoint else None
+        )
+        if multi_turn_output is None:
+            multi_turn_output = self.backend.complete(multi_turn_prompt)
+            if checkpoint:
+                checkpoint.put(strategy_name, question_id, "multi", multi_turn_prompt, multi_turn_output)
+
+        return single_turn_output, multi_turn_output
+
+    def _run_concurrent(self, questions, strategies):
+        from tqdm import tqdm
+
+        # 모든 전략의 문항을 한 풀에서 동시에 처리하고, 문항마다 single -> multi turn 을 이어서 호출
+        outputs = {strategy_name: {} for strategy_name in strategies}
+        with ThreadPoolExecutor(max_workers=max(1, self.backend.max_concurrency)) as executor:
+            futures = {
+                executor.submit(self._generate_question, strategy_name, prompts, q["id"], q["questions"]): (
+                    strategy_name,
+                    q["id"],
+                )
+                for strategy_name, prompts in strategies.items()
+                for q in questions
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Generating outputs"):
+                strategy_name, question_id = futures[future]
+                outputs[strategy_name][question_id] = future.result()
+
+        results = {}
+        for strategy_name, by_id in outputs.items():
+            single_turn_outputs, multi_turn_outputs = zip(*(by_id[q["id"]] for q in questions))
+            results[strategy_name] = (list(single_turn_outputs), list(multi_turn_outputs))
+        return results
+
+
+def create_backend(args) -> Backend:
+    if args.backend == "vllm":
+        from token_planner import parse_category_caps
+
+        category_caps = parse_category_caps(args.category_caps) if args.token_budget or args.category_caps else None
+        return VLLMBackend(
+            args.model, args.gpu_devices, args.model_len, prefix_caching=args.pipelined, category_caps=category_caps
+        )
+    if args.backend == "gemini":
+        return GeminiBackend(args.api_key, args.model, concurrency=args.concurrency, rpm=args.rpm)
+    if args.backend == "openai":
+        return OpenAIBackend(
+            args.api_key, args.model, base_url=args.base_url, concurrency=args.concurrency, rpm=args.rpm
+        )
+    if args.backend == "fake":
+        return FakeBackend(concurrency=args.concurrency)
+    raise ValueError(f"Unknown backend: {args.backend}")
+
+
+def load_questions(path: str = "questions.jsonl") -> List[dict]:
+    with open(path, encoding="utf-8-sig") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_outputs(questions: List[dict], output_path: str, single_turn_outputs, multi_turn_outputs):
+    import pandas as pd
+
+    df_output = pd.DataFrame(
+        {
+            "id": [q["id"] for q in questions],
+            "category": [q["category"] for q in questions],
+            "questions": [q["questions"] for q in questions],
+            "outputs": list(zip(single_turn_outputs, multi_turn_outputs)),
+            "references": [q["references"] for q in questions],
+        }
+    )
+    df_output.to_json(output_path, orient="records", lines=True, force_ascii=False)
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+
+class GenerationCheckpoint:
+    """Append-only JSONL log of finished generations, fsynced per line.
+
+    Entries are keyed by (strategy, id, turn) and a hash of the rendered prompt and `params`
+    (backend, model, sampling settings), so an output is only reused for the exact same request:
+    edited templates or changed settings are generated again. `clear` removes the log once the
+    final outputs are saved.
+    """
+
+    def __init__(self, path, params: Optional[dict] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.params = json.dumps(params or {}, sort_keys=True, ensure_ascii=False)
+        self.lock = Lock()
+        self.outputs = {}
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 기록 도중 중단된 마지막 줄은 무시
+                        continue
+                    if "prompt_hash" not in record:
+                        # 프롬프트 해시가 없는 이전 형식은 같은 요청인지 알 수 없으므로 사용하지 않음
+                        continue
+                    key = (record["strategy"], record["id"], record["turn"], record["prompt_hash"])
+                    self.outputs[key] = record["output"]
+
+    def prompt_hash(self, prompt) -> str:
+        payload = json.dumps([self.params, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, strategy: str, question_id: int, turn: str, prompt) -> Optional[str]:
+        return self.outputs.get((strategy, question_id, turn, self.prompt_hash(prompt)))
+
+    def put(self, strategy: str, question_id: int, turn: str, prompt, output: str):
+        prompt_hash = self.prompt_hash(prompt)
+        record = {"strategy": strategy, "id": question_id, "turn": turn, "prompt_hash": prompt_hash, "output": output}
+        with self.lock:
+            self.outputs[(strategy, question_id, turn, prompt_hash)] = output
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        with self.lock:
+            self.outputs.clear()
+            self.path.unlink(missing_ok=True)
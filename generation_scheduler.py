@@ -0,0 +1,161 @@
+import argparse
+import copy
+import json
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import METRICS
+
+
+def with_max_tokens(sampling_params, max_tokens: int):
+    params = copy.copy(sampling_params)
+    params.max_tokens = max_tokens
+    return params
+
+
+class VLLMEngine:
+    """Adapts an aphrodite/vLLM `LLM` to the add_request/step interface used by `PipelinedGenerator`.
+
+    With a `TokenBudgetPlanner`, each request gets its own max_tokens from its prompt and category.
+    Every finished request is recorded in `METRICS` (time from submission to finish, tokens).
+    """
+
+    def __init__(self, llm, sampling_params, planner=None):
+        self.engine = llm.llm_engine
+        self.sampling_params = sampling_params
+        self.planner = planner
+        self.submitted = {}
+
+    def add_request(self, request_id: str, prompt: str, category: Optional[str] = None, label: Optional[str] = None):
+        sampling_params = self.sampling_params
+        if self.planner is not None:
+            sampling_params = with_max_tokens(sampling_params, self.planner.plan(prompt, category))
+        self.submitted[request_id] = (time.perf_counter(), label)
+        self.engine.add_request(request_id, prompt, sampling_params)
+
+    def step(self) -> List[Tuple[str, str]]:
+        finished = [output for output in self.engine.step() if output.finished]
+        for output in finished:
+            if self.planner is not None:
+                self.planner.record_finish(output.outputs[0].finish_reason == "length")
+            start, label = self.submitted.pop(output.request_id, (None, None))
+            METRICS.record(
+                "generation",
+                time.perf_counter() - start if start is not None else 0.0,
+                prompt_tokens=len(output.prompt_token_ids or []),
+                completion_tokens=len(output.outputs[0].token_ids),
+                label=label,
+            )
+        return [(output.request_id, output.outputs[0].text) for output in finished]
+
+    def has_unfinished_requests(self) -> bool:
+        return self.engine.has_unfinished_requests()
+
+
+class FakeEngine:
+    """CPU stand-in for `VLLMEngine`: finishes requests in submission order, `batch_size` per step."""
+
+    def __init__(self, batch_size: int = 8, respond: Callable[[str], str] = None):
+        self.batch_size = batch_size
+        self.respond = respond or (lambda prompt: f"fake answer #{len(prompt)}")
+        self.queue = deque()
+        self.steps = 0
+        self.prompts = {}
+
+    def add_request(self, request_id: str, prompt: str, category: Optional[str] = None, label: Optional[str] = None):
+        self.prompts[request_id] = prompt
+        self.queue.append(request_id)
+
+    def step(self) -> List[Tuple[str, str]]:
+        self.steps += 1
+        finished = []
+        for _ in range(min(self.batch_size, len(self.queue))):
+            request_id = self.queue.popleft()
+            finished.append((request_id, self.respond(self.prompts[request_id])))
+        return finished
+
+    def has_unfinished_requests(self) -> bool:
+        return bool(self.queue)
+
+
+class PipelinedGenerator:
+    """Generates every strategy in one engine queue instead of one `generate` call per strategy and turn.
+
+    All single-turn prompts are submitted up front, grouped by strategy so requests sharing a
+    few-shot prefix sit next to each other for the prefix cache. Each multi-turn prompt is queued
+    the moment its own single-turn answer finishes, so there is no barrier between the two turns.
+    """
+
+    def __init__(self, engine, format_messages: Callable[[List[Dict[str, str]]], str]):
+        self.engine = engine
+        self.format_messages = format_messages
+
+    def run(self, questions: Iterable[dict], strategies: Dict[str, List[Dict[str, str]]]):
+        questions = list(questions)
+        single_outputs = {name: [None] * len(questions) for name in strategies}
+        multi_outputs = {name: [None] * len(questions) for name in strategies}
+
+        for strategy_name, prompts in strategies.items():
+            for i, question in enumerate(questions):
+                messages = prompts + [{"role": "user", "content": question["questions"][0]}]
+                self.engine.add_request(
+                    f"{strategy_name}|{i}|single",
+                    self.format_messages(messages),
+                    question.get("category"),
+                    strategy_name,
+                )
+
+        while self.engine.has_unfinished_requests():
+            for request_id, text in self.engine.step():
+                strategy_name, i, turn = request_id.rsplit("|", 2)
+                i = int(i)
+                text = text.strip()
+                if turn == "multi":
+                    multi_outputs[strategy_name][i] = text
+                    continue
+
+                single_outputs[strategy_name][i] = text
+                question = questions[i]
+                messages = strategies[strategy_name] + [
+                    {"role": "user", "content": question["questions"][0]},
+                    {"role": "assistant", "content": text},
+                    {"role": "user", "content": question["questions"][1]},
+                ]
+                self.engine.add_request(
+                    f"{strategy_name}|{i}|multi",
+                    self.format_messages(messages),
+                    question.get("category"),
+                    strategy_name,
+                )
+
+        return {name: (single_outputs[name], multi_outputs[name]) for name in strategies}
+
+
+def main():
+    # GPU 없이 스케줄링 동작을 확인하기 위한 실행 경로
+    from templates import PROMPT_STRATEGY
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-q", "--questions", help="Questions file", default="questions.jsonl")
+    parser.add_argument("-b", "--batch-size", help="Fake engine requests finished per step", default=16, type=int)
+    args = parser.parse_args()
+
+    with open(args.questions, encoding="utf-8-sig") as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+
+    def format_messages(messages):
+        return "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+
+    engine = FakeEngine(batch_size=args.batch_size)
+    results = PipelinedGenerator(engine, format_messages).run(questions, PROMPT_STRATEGY)
+
+    n_requests = sum(len(single) + len(multi) for single, multi in results.values())
+    # 전략/턴별로 generate 를 따로 부르면 필요한 최소 step 수
+    barrier_steps = sum(2 * -(-len(questions) // args.batch_size) for _ in PROMPT_STRATEGY)
+    assert all(output is not None for single, multi in results.values() for output in single + multi)
+    print(f"- {n_requests} requests in {engine.steps} steps (per-strategy/turn barriers: {barrier_steps} steps)")
+
+
+if __name__ == "__main__":
+    main()
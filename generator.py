@@ -1,104 +1,90 @@
 import argparse
 import os
 
-import pandas as pd
-
+from generation import GenerationEngine, create_backend, load_questions, save_outputs
+from generation_checkpoint import GenerationCheckpoint
+from metrics import METRICS
 from templates import PROMPT_STRATEGY
 
-# Use aphrodite-engine or vLLM
-try:
-    from aphrodite import LLM, SamplingParams
-
-    print("- Using aphrodite-engine")
-
-except ImportError:
-    from vllm import LLM, SamplingParams
-
-    print("- Using vLLM")
 
-parser = argparse.ArgumentParser()
-parser.add_argument("-g", "--gpu_devices", help=" : CUDA_VISIBLE_DEVICES", default="0")
-parser.add_argument(
-    "-m",
-    "--model",
-    help=" : Model to evaluate",
-    default="yanolja/EEVE-Korean-Instruct-2.8B-v1.0",
-)
-parser.add_argument("-ml", "--model_len", help=" : Maximum Model Length", default=4096, type=int)
-args = parser.parse_args()
-
-print(f"Args - {args}")
+def get_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-b",
+        "--backend",
+        help=" : Generation backend",
+        choices=["vllm", "gemini", "openai", "fake"],
+        default="vllm",
+    )
+    parser.add_argument("-g", "--gpu_devices", help=" : CUDA_VISIBLE_DEVICES", default="0")
+    parser.add_argument(
+        "-m",
+        "--model",
+        help=" : Model to evaluate",
+        default="yanolja/EEVE-Korean-Instruct-2.8B-v1.0",
+    )
+    parser.add_argument("-ml", "--model_len", help=" : Maximum Model Length", default=4096, type=int)
+    parser.add_argument(
+        "--pipelined",
+        help=" : Generate every strategy in one queue with prefix caching; multi-turn starts per question",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--token_budget",
+        help=" : Per-request max_tokens from the remaining context and per-category caps (vllm backend)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--category_caps", help=" : Override category caps, e.g. Writing=3072,Coding=2048 (implies --token_budget)"
+    )
+    parser.add_argument("-k", "--api_key", help=" : API key (gemini / openai backends)", default=None)
+    parser.add_argument("--base_url", help=" : OpenAI-compatible API base URL (openai backend)", default=None)
+    parser.add_argument("-c", "--concurrency", help=" : Concurrent API calls (API backends)", default=8, type=int)
+    parser.add_argument("--rpm", help=" : Requests per minute limit (API backends)", default=None, type=int)
+    parser.add_argument("--metrics_file", help=" : Append per-request generation metrics (JSONL)", default=None)
+    return parser.parse_args(argv)
 
-os.environ["CUDA_VISIBLE_DEVICES"] = args.gpu_devices
-gpu_counts = len(args.gpu_devices.split(","))
 
-llm = LLM(
-    model=args.model,
-    tensor_parallel_size=gpu_counts,
-    max_model_len=args.model_len,
-    gpu_memory_utilization=0.8,
-    trust_remote_code=True,  # !
-)
+def main(argv=None):
+    args = get_args(argv)
 
-sampling_params = SamplingParams(
-    temperature=0,
-    skip_special_tokens=True,
-    max_tokens=args.model_len,
-    stop=["<|endoftext|>", "[INST]", "[/INST]", "<|im_end|>", "<|end|>", "<|eot_id|>", "<end_of_turn>", "<eos>"],
-)
+    print(f"Args - {args}")
 
-df_questions = pd.read_json("questions.jsonl", orient="records", encoding="utf-8-sig", lines=True)
+    backend = create_backend(args)
+    print(f"- Backend : {backend.capabilities()}")
 
-if not os.path.exists("./generated/" + args.model):
-    os.makedirs("./generated/" + args.model)
+    questions = load_questions("questions.jsonl")
+    output_dir = "./generated/" + args.model
 
-for strategy_name, prompts in PROMPT_STRATEGY.items():
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
 
-    def format_single_turn_question(question):
-        return llm.llm_engine.tokenizer.tokenizer.apply_chat_template(
-            prompts + [{"role": "user", "content": question[0]}],
-            tokenize=False,
-            add_generation_prompt=True,
+    # API 백엔드는 유료 호출이므로 문항 단위로 체크포인트를 남김
+    checkpoint = None
+    if not backend.supports_batching:
+        checkpoint = GenerationCheckpoint(
+            os.path.join(output_dir, ".checkpoint", "checkpoint.jsonl"), backend.generation_params()
         )
 
-    single_turn_questions = df_questions["questions"].map(format_single_turn_question)
-    print(single_turn_questions.iloc[0])
-    single_turn_outputs = [
-        output.outputs[0].text.strip() for output in llm.generate(single_turn_questions, sampling_params)
-    ]
+    METRICS.configure(args.metrics_file)
+    engine = GenerationEngine(backend, pipelined=args.pipelined, checkpoint=checkpoint)
+    results = engine.run(questions, PROMPT_STRATEGY)
+    METRICS.close()
 
-    def format_double_turn_question(question, single_turn_output):
-        return llm.llm_engine.tokenizer.tokenizer.apply_chat_template(
-            prompts
-            + [
-                {"role": "user", "content": question[0]},
-                {"role": "assistant", "content": single_turn_output},
-                {"role": "user", "content": question[1]},
-            ],
-            tokenize=False,
-            add_generation_prompt=True,
+    for strategy_name, (single_turn_outputs, multi_turn_outputs) in results.items():
+        save_outputs(
+            questions, os.path.join(output_dir, f"{strategy_name}.jsonl"), single_turn_outputs, multi_turn_outputs
         )
+    # 최종 결과를 모두 저장한 뒤에는 체크포인트가 다음 실행에 섞이지 않도록 삭제
+    if checkpoint is not None:
+        checkpoint.clear()
 
-    multi_turn_questions = df_questions[["questions", "id"]].apply(
-        lambda x: format_double_turn_question(x["questions"], single_turn_outputs[x["id"] - 1]),
-        axis=1,
-    )
-    multi_turn_outputs = [
-        output.outputs[0].text.strip() for output in llm.generate(multi_turn_questions, sampling_params)
-    ]
+    summary = METRICS.summary()
+    if summary:
+        print(summary)
+    if getattr(backend, "planner", None) is not None:
+        print(backend.planner.summary())
 
-    df_output = pd.DataFrame(
-        {
-            "id": df_questions["id"],
-            "category": df_questions["category"],
-            "questions": df_questions["questions"],
-            "outputs": list(zip(single_turn_outputs, multi_turn_outputs)),
-            "references": df_questions["references"],
-        }
-    )
-    df_output.to_json(
-        "./generated/" + os.path.join(args.model, f"{strategy_name}.jsonl"),
-        orient="records",
-        lines=True,
-        force_ascii=False,
-    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from evaluator import build_judge_request, create_judge_plan, load_near_duplicates, prepare_files, process_file
+from judge_parser import parse_judge_output
+from judge_plan import JudgePlan
+
+# OpenAI Batch API 입력 파일 한도 (요청 50,000개 / 200MB)
+MAX_REQUESTS_PER_SHARD = 50000
+MAX_BYTES_PER_SHARD = 190 * 1024 * 1024
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# 결과 없이 끝난 batch. 재실행 시 같은 샤드를 다시 제출함
+FAILED_STATUSES = {"failed", "expired", "cancelled"}
+IS_MULTI_TURN = {"single": False, "multi": True}
+
+
+def batch_endpoint(azure: bool) -> str:
+    return "/chat/completions" if azure else "/v1/chat/completions"
+
+
+def make_custom_id(relative_path: str, row_id, turn: str) -> str:
+    return f"{relative_path}|{row_id}|{turn}"
+
+
+def build_batch_requests(
+    plan: JudgePlan, judge_model, cache, results: dict, judge_format: str = "text", azure: bool = False
+) -> Tuple[List[dict], Dict[str, str]]:
+    """One request per unique prompt of `plan`. Cached answers go straight into `results` (keyed by prompt key).
+
+    Returns the requests and a custom_id -> prompt key map for reading the batch output back.
+    """
+    requests, custom_ids, requested = [], {}, set()
+    for (relative_path, row_id, turn), key in plan.entries.items():
+        if key in requested or key in results:
+            continue
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                results[key] = cached
+                continue
+        requested.add(key)
+        custom_id = make_custom_id(relative_path, row_id, turn)
+        custom_ids[custom_id] = key
+        requests.append(
+            {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": batch_endpoint(azure),
+                "body": build_judge_request(plan.prompts[key], judge_model, IS_MULTI_TURN[turn], judge_format),
+            }
+        )
+    return requests, custom_ids
+
+
+def write_shards(requests: List[dict], batch_dir: Path) -> List[Path]:
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    shards = []
+    lines, size = [], 0
+
+    def flush():
+        shard = batch_dir / f"shard-{len(shards):03d}.jsonl"
+        shard.write_text("".join(lines), encoding="utf-8")
+        shards.append(shard)
+
+    for request in requests:
+        line = json.dumps(request, ensure_ascii=False) + "\n"
+        line_size = len(line.encode("utf-8"))
+        if lines and (len(lines) >= MAX_REQUESTS_PER_SHARD or size + line_size > MAX_BYTES_PER_SHARD):
+            flush()
+            lines, size = [], 0
+        lines.append(line)
+        size += line_size
+    if lines:
+        flush()
+    return shards
+
+
+def submit_shards(client, shards: List[Path], state_file: Path, azure: bool = False) -> List[str]:
+    # 샤드 내용 해시 -> batch id 를 기록해 두어 재실행 시 같은 샤드를 다시 제출하지 않음
+    state = json.loads(state_file.read_text(encoding="utf-8")) if state_file.exists() else {}
+    batch_ids = []
+    for shard in shards:
+        digest = hashlib.sha256(shard.read_bytes()).hexdigest()
+        if digest in state:
+            status = client.batches.retrieve(state[digest]).status
+            if status in FAILED_STATUSES:
+                print(f"- Batch {state[digest]} 가 {status} 상태로 끝나 다시 제출 : {shard.name}")
+                del state[digest]
+        if digest not in state:
+            with shard.open("rb") as f:
+                input_file = client.files.create(file=f, purpose="batch")
+            batch = client.batches.create(
+                input_file_id=input_file.id, endpoint=batch_endpoint(azure), completion_window="24h"
+            )
+            state[digest] = batch.id
+            state_file.write_text(json.dumps(state, indent=2), encoding="utf-8")
+            print(f"- Batch 제출 : {shard.name} -> {batch.id}")
+        batch_ids.append(state[digest])
+    return batch_ids
+
+
+def poll_batches(client, batch_ids: List[str], poll_interval: float) -> list:
+    while True:
+        batches = [client.batches.retrieve(batch_id) for batch_id in batch_ids]
+        statuses = [batch.status for batch in batches]
+        print(f"- Batch 상태 : {', '.join(f'{b.id}={b.status}' for b in batches)}")
+        if all(status in TERMINAL_STATUSES for status in statuses):
+            return batches
+        time.sleep(poll_interval)
+
+
+def collect_results(client, batches, results: dict, custom_ids: Dict[str, str]):
+    for batch in batches:
+        if not batch.output_file_id:
+            print(f"- Batch {batch.id} 결과 없음 ({batch.status})")
+            continue
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            output = json.loads(line)
+            response = output.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            try:
+                results[custom_ids[output["custom_id"]]] = parse_judge_output(
+                    response["body"]["choices"][0]["message"]["content"]
+                )
+            except (KeyError, IndexError, ValueError):
+                # 파싱 실패한 항목은 아래에서 동기 호출로 다시 평가
+                continue
+
+
+def run_batch(client, json_files: List[Path], input_dir: Path, output_dir: Path, args, writer, cache=None):
+    plan = create_judge_plan(args.judge_model, args.judge_format)
+    prepared_files = prepare_files(
+        json_files, input_dir, output_dir, args.resume, plan, load_near_duplicates(args, output_dir)
+    )
+
+    # 유사 답변으로 이미 정해진 프롬프트는 배치에 넣지 않음
+    results = dict(plan.resolved)
+    requests, custom_ids = build_batch_requests(
+        plan, args.judge_model, cache, results, args.judge_format, azure=args.azure
+    )
+    print(f"- Batch 요청 {len(requests)}개 (캐시/유사 답변 사용 {len(results)}개)")
+
+    if requests:
+        batch_dir = Path(args.batch_dir)
+        shards = write_shards(requests, batch_dir)
+        batch_ids = submit_shards(client, shards, batch_dir / "batches.json", azure=args.azure)
+        batches = poll_batches(client, batch_ids, args.batch_poll_interval)
+        collect_results(client, batches, results, custom_ids)
+        if cache is not None:
+            for key in custom_ids.values():
+                if key in results:
+                    cache.put(key, results[key])
+
+    # 배치 결과는 judge 호출 없이 확정하고, 실패/파싱 실패한 프롬프트만 일반 평가 경로(-t 스레드)로 다시 평가
+    plan.resolved.update(results)
+    n_failed = len(plan.prompts) - len(plan.resolved)
+    if n_failed:
+        print(f"- Batch 에서 결과를 얻지 못한 프롬프트 {n_failed}개는 일반 API 로 평가")
+    for prepared_file in prepared_files:
+        process_file(client, prepared_file, plan, args.threads, args, writer, cache)
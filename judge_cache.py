@@ -0,0 +1,45 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Union
+
+
+class JudgeCache:
+    """SQLite store of judge results keyed by a hash of (judge model, judge template, prompt)."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.lock = Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS judgments (key TEXT PRIMARY KEY, judge_message TEXT, judge_score REAL)"
+        )
+
+    @staticmethod
+    def make_key(judge_model: str, template_name: str, template: str, prompt: str) -> str:
+        # 템플릿 내용까지 키에 포함하여 JUDGE_TEMPLATE 수정 시 자동으로 캐시가 무효화되도록 함
+        payload = json.dumps([judge_model, template_name, template, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Union[str, float]]]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT judge_message, judge_score FROM judgments WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"judge_message": row[0], "judge_score": row[1]}
+
+    def put(self, key: str, answer: Dict[str, Union[str, float]]):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO judgments (key, judge_message, judge_score) VALUES (?, ?, ?)",
+                (key, answer["judge_message"], answer["judge_score"]),
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import json
+import statistics
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from evaluator import (
+    IMPOSSIBLE_ANSWER,
+    build_judge_prompt,
+    create_async_client,
+    judge_prompt_async,
+    load_pending_rows,
+    prompt_cache_key,
+)
+from metrics import CURRENT_LABEL
+from ratelimit import AsyncAdaptiveConcurrency, RateLimiter
+
+TURNS = {"single": False, "multi": True}
+SPEC_OPTIONS = {"base_url": str, "api_key": str, "rpm": int, "tpm": int, "concurrency": int}
+AGGREGATES = {"mean": statistics.fmean, "median": statistics.median}
+
+
+class JudgeBackend:
+    """One judge model with its own client, RPM/TPM budget and concurrency limit."""
+
+    def __init__(self, model: str, client, limiter: RateLimiter, concurrency: AsyncAdaptiveConcurrency):
+        self.model = model
+        self.client = client
+        self.limiter = limiter
+        self.concurrency = concurrency
+
+
+def parse_judge_spec(spec: str) -> dict:
+    """Parse `MODEL[,key=value...]`, e.g. `gpt-4o,rpm=500,concurrency=32` or `my-judge,base_url=http://...`."""
+    model, *options = spec.split(",")
+    config = {"model": model.strip()}
+    for option in options:
+        key, separator, value = option.partition("=")
+        key = key.strip()
+        if not separator or key not in SPEC_OPTIONS:
+            raise ValueError(f"Invalid judge option '{option}' in '{spec}' (allowed: {', '.join(SPEC_OPTIONS)})")
+        config[key] = SPEC_OPTIONS[key](value.strip())
+    return config
+
+
+def create_backends(args) -> List[JudgeBackend]:
+    backends = []
+    for spec in args.judges:
+        config = parse_judge_spec(spec)
+        if any(backend.model == config["model"] for backend in backends):
+            raise ValueError(f"Judge listed twice: {config['model']}")
+        client = create_async_client(
+            config.get("api_key", args.openai_api_key),
+            azure=args.azure and "base_url" not in config,
+            base_url=config.get("base_url", args.base_url),
+        )
+        limiter = RateLimiter(rpm=config.get("rpm", args.rpm), tpm=config.get("tpm", args.tpm))
+        concurrency = AsyncAdaptiveConcurrency(
+            config.get("concurrency", args.threads), args.max_threads, adaptive=args.adaptive
+        )
+        backends.append(JudgeBackend(config["model"], client, limiter, concurrency))
+    return backends
+
+
+def aggregate_answers(answers: Dict[str, dict], method: str = "mean") -> dict:
+    """Combine per-judge answers into the single `query_*` entry that score.py reads."""
+    valid = {model: answer for model, answer in answers.items() if answer != IMPOSSIBLE_ANSWER}
+    if not valid:
+        return IMPOSSIBLE_ANSWER.copy()
+    score = AGGREGATES[method]([answer["judge_score"] for answer in valid.values()])
+    # 집계 점수에 가장 가까운 judge 의 평가문을 대표로 사용
+    representative = min(valid, key=lambda model: abs(valid[model]["judge_score"] - score))
+    return {"judge_message": valid[representative]["judge_message"], "judge_score": score}
+
+
+async def judge_with_backend(backend: JudgeBackend, prompt: str, label: str, is_multi_turn: bool, cache, judge_format):
+    CURRENT_LABEL.set(f"{label} [{backend.model}]")
+    key = prompt_cache_key(prompt, backend.model, is_multi_turn, judge_format) if cache is not None else None
+    if key is not None:
+        answer = cache.get(key)
+        if answer is not None:
+            return answer
+
+    answer = await judge_prompt_async(
+        backend.client, prompt, backend.model, backend.limiter, backend.concurrency, is_multi_turn, judge_format
+    )
+    if key is not None and answer != IMPOSSIBLE_ANSWER:
+        cache.put(key, answer)
+    return answer
+
+
+async def judge_row(backends: List[JudgeBackend], row: dict, label: str, output_file: Path, writer, cache, args):
+    # 프롬프트는 turn 마다 한 번만 만들어 모든 judge 가 공유
+    prompts = {turn: build_judge_prompt(row, is_multi_turn) for turn, is_multi_turn in TURNS.items()}
+    calls = [(turn, backend) for turn in TURNS for backend in backends]
+    answers = await asyncio.gather(
+        *(
+            judge_with_backend(backend, prompts[turn], label, TURNS[turn], cache, args.judge_format)
+            for turn, backend in calls
+        )
+    )
+
+    for turn in TURNS:
+        row[f"judges_{turn}"] = {
+            backend.model: answer for (call_turn, backend), answer in zip(calls, answers) if call_turn == turn
+        }
+        row[f"query_{turn}"] = aggregate_answers(row[f"judges_{turn}"], args.ensemble_aggregate)
+    writer.write(output_file, row)
+
+
+async def run_ensemble(args, json_files: List[Path], input_dir: Path, output_dir: Path, writer, cache=None):
+    backends = create_backends(args)
+    print(f"- Judges : {', '.join(backend.model for backend in backends)} ({args.ensemble_aggregate})")
+
+    try:
+        rows = []
+        for file_path in json_files:
+            label = file_path.relative_to(input_dir).as_posix()
+            output_file = output_dir / label
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            df_model_outputs = load_pending_rows(file_path, output_file, args.resume)
+            if df_model_outputs.empty:
+                print(f"이미 평가 완료.. : {file_path}")
+                continue
+            print(f"- 현재 Processing : {file_path} ({len(df_model_outputs)} rows)")
+            rows.extend((row, label, output_file) for row in df_model_outputs.to_dict(orient="records"))
+
+        # 모든 파일/judge 요청을 한 이벤트 루프에서 judge 별 한도에 맞춰 동시에 처리
+        await asyncio.gather(
+            *(judge_row(backends, row, label, output_file, writer, cache, args) for row, label, output_file in rows)
+        )
+    finally:
+        # 이벤트 루프가 닫힌 뒤 연결 정리가 실행되지 않도록 루프 안에서 client 를 닫음
+        for backend in backends:
+            await backend.client.close()
+
+
+def iter_judge_scores(evaluated_dir: str, files: Optional[Iterable[Path]] = None):
+    """Yield {judge: score} for every (row, turn) of ensemble outputs in `files` (default: all of `evaluated_dir`)."""
+    paths = sorted(Path(evaluated_dir).rglob("*.jsonl")) if files is None else [Path(path) for path in files]
+    for path in paths:
+        if not path.exists():
+            continue
+        with open(path, encoding="utf-8-sig") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                for turn in TURNS:
+                    judges = row.get(f"judges_{turn}")
+                    if judges:
+                        yield {
+                            model: answer["judge_score"]
+                            for model, answer in judges.items()
+                            if answer != IMPOSSIBLE_ANSWER
+                        }
+
+
+def print_agreement(judge_scores) -> None:
+    import numpy as np
+
+    judge_scores = list(judge_scores)
+    judges = sorted({model for scores in judge_scores for model in scores})
+    if not judges:
+        print("- No ensemble judgements found")
+        return
+    matrix = np.full((len(judge_scores), len(judges)), np.nan)
+    for i, scores in enumerate(judge_scores):
+        for j, model in enumerate(judges):
+            matrix[i, j] = scores.get(model, np.nan)
+
+    print("| judge | judgements | mean score |\n|---|---|---|")
+    for j, model in enumerate(judges):
+        column = matrix[:, j][~np.isnan(matrix[:, j])]
+        print(f"| {model} | {len(column)} | {column.mean():.2f} |")
+
+    print(
+        "\n| judge A | judge B | shared | pearson r | mean abs diff | exact | within 1 |\n|---|---|---|---|---|---|---|"
+    )
+    for a, b in combinations(range(len(judges)), 2):
+        shared = ~np.isnan(matrix[:, a]) & ~np.isnan(matrix[:, b])
+        x, y = matrix[shared, a], matrix[shared, b]
+        if len(x) < 2:
+            continue
+        difference = np.abs(x - y)
+        pearson = np.corrcoef(x, y)[0, 1] if x.std() and y.std() else float("nan")
+        print(
+            f"| {judges[a]} | {judges[b]} | {len(x)} | {pearson:.3f} | {difference.mean():.2f} "
+            f"| {(difference == 0).mean():.1%} | {(difference <= 1).mean():.1%} |"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inter-judge agreement of ensemble judge outputs")
+    parser.add_argument("-e", "--evaluated-dir", help="Evaluated outputs of an ensemble run", default="./evaluated")
+    args = parser.parse_args(argv)
+    print_agreement(iter_judge_scores(args.evaluated_dir))
+
+
+if __name__ == "__main__":
+    main()
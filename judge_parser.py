@@ -0,0 +1,143 @@
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+NO_MESSAGE = "No judge message found"
+
+# 마크다운 강조(**)는 메시지에서도 제거하던 기존 동작을 유지
+_STRIP_MARKDOWN = str.maketrans("", "", "*")
+
+# "점수: 7" 형식의 점수 라벨. "점수 : 7점", "Score: 7/10", "점수: [[7]]" 등의 변형 허용
+_SCORE_PATTERN = re.compile(
+    r"(?P<label>점수|평점|Score|Rating)\s*[:：]\s*\[*\s*(?P<score>\d+(?:\.\d+)?)", re.IGNORECASE
+)
+_MESSAGE_PATTERN = re.compile(r"(?:평가|Evaluation|Explanation)\s*[:：]", re.IGNORECASE)
+_JSON_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.DOTALL)
+
+_JSON_MESSAGE_KEYS = ("평가", "judge_message", "evaluation", "explanation")
+_JSON_SCORE_KEYS = ("점수", "judge_score", "score", "rating")
+
+
+def _parse_json(content: str) -> Optional[Dict[str, Union[str, float]]]:
+    # 응답 전체가 JSON 객체(또는 코드 블록 하나)일 때만 시도. 평가문 안에 인용된 JSON 은 무시
+    text = content.strip()
+    fenced = _JSON_FENCE_PATTERN.fullmatch(text)
+    if fenced:
+        text = fenced.group(1)
+    if not text.startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    score = next((data[key] for key in _JSON_SCORE_KEYS if key in data), None)
+    # float(True) 가 1.0 이 되므로 bool 은 점수로 받지 않음
+    if isinstance(score, bool):
+        return None
+    try:
+        score = float(score)
+    except (TypeError, ValueError):
+        return None
+    message = next((data[key] for key in _JSON_MESSAGE_KEYS if key in data), NO_MESSAGE)
+    return {"judge_message": str(message).strip(), "judge_score": score}
+
+
+def parse_judge_output(content: str) -> Dict[str, Union[str, float]]:
+    """Extract `judge_message` and `judge_score` from a judge response.
+
+    Accepts the JSON object requested in structured-output mode as well as the free-text
+    "평가: ... 점수: N" format and its common variants. When several score labels appear, the
+    last "점수:" wins (labels quoted inside the explanation come before it). A bare number
+    without a label is not guessed at: ValueError is raised so the caller retries.
+    """
+    if content is None:
+        raise ValueError("Empty judge response")
+
+    parsed = _parse_json(content)
+    if parsed is not None:
+        return parsed
+
+    text = content.translate(_STRIP_MARKDOWN)
+    matches = list(_SCORE_PATTERN.finditer(text))
+    if matches:
+        # 평가문 안에 인용된 "Rating: 3" 같은 라벨보다 템플릿이 요구한 "점수:" 를, 그중에서도 마지막 것을 사용
+        match = ([m for m in matches if m.group("label") == "점수"] or matches)[-1]
+        message = _MESSAGE_PATTERN.search(text, 0, match.start())
+        return {
+            "judge_message": text[message.end() : match.start()].strip() if message else NO_MESSAGE,
+            "judge_score": float(match.group("score")),
+        }
+
+    raise ValueError("No score found in response")
+
+
+def legacy_parse(content: str) -> Dict[str, Union[str, float]]:
+    """The original two-regex parser, kept for the corpus check below."""
+    judge_message_match = re.search(r"평가:(.*?)점수:", content.replace("*", ""), re.DOTALL)
+    judge_message = judge_message_match.group(1).strip() if judge_message_match else NO_MESSAGE
+    judge_score_match = re.search(r"점수:\s*(\d+(\.\d+)?)", content.replace("*", ""))
+    if not judge_score_match:
+        raise ValueError("No score found in response")
+    return {"judge_message": judge_message, "judge_score": float(judge_score_match.group(1))}
+
+
+def corpus_variants(message: str, score: float):
+    """Render a stored judgement back into the response formats judges are seen to produce."""
+    number = f"{score:g}"
+    yield "canonical", f"평가: {message}\n\n점수: {number}"
+    yield "markdown", f"**평가:** {message}\n\n**점수:** {number}"
+    yield "spaced", f"평가 : {message}\n점수 : {number}점"
+    yield "out_of_ten", f"평가: {message}\n점수: {number}/10"
+    yield "brackets", f"평가: {message}\n점수: [[{number}]]"
+    yield "json", json.dumps({"평가": message, "점수": score}, ensure_ascii=False)
+    yield "json_fenced", "```json\n" + json.dumps({"평가": message, "점수": score}, ensure_ascii=False) + "\n```"
+
+
+def check_corpus(evaluated_dir: str) -> int:
+    """Re-parse every judgement under `evaluated_dir` in every format variant; returns the failure count."""
+    checked = failures = 0
+    for path in sorted(Path(evaluated_dir).rglob("*.jsonl")):
+        with open(path, encoding="utf-8-sig") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                for turn in ("query_single", "query_multi"):
+                    judgement = row.get(turn)
+                    if not judgement:
+                        continue
+                    # 저장된 메시지는 이미 '*' 가 제거되고 strip 된 상태
+                    expected = {
+                        "judge_message": judgement["judge_message"],
+                        "judge_score": float(judgement["judge_score"]),
+                    }
+                    for variant, content in corpus_variants(expected["judge_message"], expected["judge_score"]):
+                        checked += 1
+                        try:
+                            parsed = parse_judge_output(content)
+                        except ValueError:
+                            parsed = None
+                        if variant == "canonical" and parsed != legacy_parse(content):
+                            parsed = None
+                        if parsed != expected:
+                            failures += 1
+                            if failures <= 10:
+                                print(f"- {path} id={row.get('id')} {turn} [{variant}] : {parsed}")
+    print(f"- {checked} judge responses checked, {failures} failures")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Judge output parser self-check")
+    parser.add_argument("-e", "--evaluated-dir", help="Evaluated outputs to re-parse", default="./evaluated")
+    args = parser.parse_args(argv)
+    raise SystemExit(1 if check_corpus(args.evaluated_dir) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+from concurrent.futures import Future
+from threading import Lock
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+TURNS = ("single", "multi")
+
+
+class JudgePlan:
+    """Every judge prompt of a run, built once before any request is sent.
+
+    Prompts are keyed by their cache key (judge model, template, prompt), so rows sharing an
+    identical prompt - e.g. the same answer under two strategies or models - share one key.
+    `judge` / `judge_async` dispatch each key once and hand the result to every row asking for it.
+    `judge_id` identifies the judge model and template behind the keys, if known.
+    """
+
+    def __init__(
+        self,
+        build_prompt: Callable[[dict, str], str],
+        make_key: Callable[[str, str], str],
+        judge_id: Optional[dict] = None,
+    ):
+        self.build_prompt = build_prompt
+        self.make_key = make_key
+        self.judge_id = judge_id
+        self.entries: Dict[Tuple[str, Hashable, str], str] = {}
+        self.prompts: Dict[str, str] = {}
+        self.resolved: Dict[str, dict] = {}
+        self.lock = Lock()
+        self.futures = {}
+
+    def add_rows(self, label: str, rows: Iterable[dict]):
+        for row in rows:
+            for turn in TURNS:
+                prompt = self.build_prompt(row, turn)
+                key = self.make_key(prompt, turn)
+                self.entries[(label, row["id"], turn)] = key
+                self.prompts.setdefault(key, prompt)
+
+    def lookup(self, label: str, row_id, turn: str) -> Tuple[str, str]:
+        key = self.entries[(label, row_id, turn)]
+        return key, self.prompts[key]
+
+    def resolve(self, label: str, row_id, turn: str, answer: dict):
+        """Answer a prompt without a judge call (e.g. the judgement of a near-duplicate answer)."""
+        self.resolved[self.entries[(label, row_id, turn)]] = answer
+
+    def summary(self) -> str:
+        n_requests, n_unique = len(self.entries), len(self.prompts)
+        return f"- Judge 프롬프트 {n_requests}개 중 고유 {n_unique}개 (중복 {n_requests - n_unique}개는 결과 공유)"
+
+    def judge(self, key: str, compute: Callable[[], dict]) -> dict:
+        """Run `compute` for the first caller of `key`; concurrent and later callers wait for its result."""
+        if key in self.resolved:
+            return self.resolved[key]
+        with self.lock:
+            future = self.futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self.futures[key] = Future()
+        if is_owner:
+            try:
+                future.set_result(compute())
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+        return future.result()
+
+    async def judge_async(self, key: str, compute: Callable[[], "asyncio.Future"]) -> dict:
+        if key in self.resolved:
+            return self.resolved[key]
+        task = self.futures.get(key)
+        if task is None:
+            task = self.futures[key] = asyncio.ensure_future(compute())
+        return await task
@@ -0,0 +1,35 @@
+import argparse
+import importlib
+import sys
+
+# 서브커맨드 -> (모듈, 설명). 모듈은 해당 서브커맨드가 실행될 때만 import 됨
+COMMANDS = {
+    "generate": ("generator", "Generate model outputs for every prompt strategy"),
+    "evaluate": ("evaluator", "Judge generated outputs"),
+    "score": ("score", "Print scores and leaderboards from judge outputs"),
+    "worker": ("work_queue", "Judge tasks from an evaluator work queue (--queue)"),
+    "agreement": ("judge_ensemble", "Inter-judge agreement of ensemble judge outputs"),
+    "near-duplicates": ("answer_index", "Judgement reuse for near-duplicate answers: calls saved vs. score drift"),
+    "store": ("columnar_store", "Export/import generated or evaluated outputs as a Parquet store"),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        prog="logickor",
+        description="LogicKor benchmark CLI",
+        epilog="\n".join(f"  {name:<10} {help_text}" for name, (_, help_text) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=COMMANDS, help="Subcommand (use '<command> --help' for its options)")
+
+    # 서브커맨드 이후 인자는 각 스크립트의 파서에 그대로 넘김
+    if not argv or argv[0] not in COMMANDS:
+        parser.parse_args(argv[:1])
+    module = importlib.import_module(COMMANDS[argv[0]][0])
+    module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import contextvars
+import json
+import os
+import time
+from threading import Lock
+from typing import Optional
+
+# 현재 호출이 속한 입력 파일 등. 스레드/태스크마다 따로 설정됨
+CURRENT_LABEL = contextvars.ContextVar("metrics_label", default="-")
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def prometheus_label(value) -> str:
+    # Prometheus text format 의 label 값 escape
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRecorder:
+    """Collects one record per API attempt (latency, tokens, outcome) and summarises them per label.
+
+    Records are kept in memory for the end-of-run summary and, when `path` is set, appended to a
+    JSONL metrics file as they arrive. Summaries count `requests` (first attempts) separately from
+    `attempts` (every call, retries included).
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.records = []
+        self.started_at = time.time()
+        self.file = None
+        self.price_prompt = 0.0
+        self.price_completion = 0.0
+
+    def configure(self, path: Optional[str] = None, price_prompt: float = 0.0, price_completion: float = 0.0):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+            self.file = open(path, "a", encoding="utf-8") if path else None
+            self.price_prompt = price_prompt
+            self.price_completion = price_completion
+            self.records = []
+            self.started_at = time.time()
+
+    def record(
+        self,
+        kind: str,
+        latency: float,
+        ok: bool = True,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        attempt: int = 0,
+        error: Optional[str] = None,
+        parse_failure: bool = False,
+        label: Optional[str] = None,
+    ):
+        record = {
+            "time": time.time(),
+            "kind": kind,
+            "label": label or CURRENT_LABEL.get(),
+            "latency": latency,
+            "ok": ok,
+            "attempt": attempt,
+            "prompt_tokens": prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "parse_failure": parse_failure,
+            "error": error,
+        }
+        with self.lock:
+            self.records.append(record)
+            if self.file is not None:
+                self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.file.flush()
+
+    def record_usage(self, kind: str, latency: float, usage, **kwargs):
+        """Record a successful OpenAI-style response, reading tokens from `response.usage`."""
+        self.record(
+            kind,
+            latency,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            **kwargs,
+        )
+
+    def _groups(self):
+        groups = {}
+        for record in self.records:
+            groups.setdefault((record["kind"], record["label"]), []).append(record)
+        return groups
+
+    def _cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.price_prompt + completion_tokens * self.price_completion) / 1_000_000
+
+    def summary(self) -> str:
+        with self.lock:
+            groups = self._groups()
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            n_records = len(self.records)
+        if not groups:
+            return ""
+
+        lines = [
+            "| kind | label | requests | attempts | ok | retries | parse fail | p50 (s) | p95 (s) | p99 (s) "
+            "| prompt tok | completion tok | cost ($) |",
+            "|---|---|---|---|---|---|---|---|---|---|---|---|---|",
+        ]
+        for (kind, label), records in sorted(groups.items()):
+            latencies = [record["latency"] for record in records]
+            prompt_tokens = sum(record["prompt_tokens"] for record in records)
+            completion_tokens = sum(record["completion_tokens"] for record in records)
+            lines.append(
+                f"| {kind} | {label} | {sum(record['attempt'] == 0 for record in records)} | {len(records)} "
+                f"| {sum(record['ok'] for record in records)} "
+                f"| {sum(record['attempt'] > 0 for record in records)} "
+                f"| {sum(record['parse_failure'] for record in records)} "
+                f"| {percentile(latencies, 50):.2f} | {percentile(latencies, 95):.2f} | {percentile(latencies, 99):.2f} "
+                f"| {prompt_tokens} | {completion_tokens} | {self._cost(prompt_tokens, completion_tokens):.4f} |"
+            )
+        lines.append(f"\n- {n_records} attempts in {elapsed:.1f}s ({n_records / elapsed:.2f} attempts/s)")
+        return "\n".join(lines)
+
+    def write_prometheus(self, path: str):
+        """Write a node_exporter textfile-collector snapshot of the current totals."""
+        with self.lock:
+            groups = self._groups()
+        lines = [
+            "# TYPE logickor_requests_total counter",
+            "# TYPE logickor_attempts_total counter",
+            "# TYPE logickor_request_errors_total counter",
+            "# TYPE logickor_parse_failures_total counter",
+            "# TYPE logickor_tokens_total counter",
+            "# TYPE logickor_request_latency_seconds summary",
+        ]
+        for (kind, label), records in sorted(groups.items()):
+            tags = f'kind="{prometheus_label(kind)}",label="{prometheus_label(label)}"'
+            latencies = [record["latency"] for record in records]
+            lines.append(f"logickor_requests_total{{{tags}}} {sum(record['attempt'] == 0 for record in records)}")
+            lines.append(f"logickor_attempts_total{{{tags}}} {len(records)}")
+            lines.append(f"logickor_request_errors_total{{{tags}}} {sum(not record['ok'] for record in records)}")
+            lines.append(
+                f"logickor_parse_failures_total{{{tags}}} {sum(record['parse_failure'] for record in records)}"
+            )
+            for token_type in ("prompt", "completion"):
+                total = sum(record[f"{token_type}_tokens"] for record in records)
+                lines.append(f'logickor_tokens_total{{{tags},type="{token_type}"}} {total}')
+            for q in (0.5, 0.95, 0.99):
+                lines.append(
+                    f'logickor_request_latency_seconds{{{tags},quantile="{q}"}} {percentile(latencies, q * 100):.6f}'
+                )
+            lines.append(f"logickor_request_latency_seconds_sum{{{tags}}} {sum(latencies):.6f}")
+            lines.append(f"logickor_request_latency_seconds_count{{{tags}}} {len(latencies)}")
+        # textfile collector 가 쓰는 중인 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+METRICS = MetricsRecorder()
@@ -0,0 +1,330 @@
+import argparse
+import email
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from email import policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+# 분포 이름 -> 파라미터 개수 (모두 ms 단위, lognormal 은 중앙값과 sigma)
+LATENCY_DISTRIBUTIONS = {"fixed": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+
+
+def mock_judge_content(prompt: str, json_output: bool = False, model: str = "", malformed: bool = False) -> str:
+    # 같은 (모델, 프롬프트)에는 항상 같은 점수를 돌려주어 결과를 재현 가능하게 함
+    score = int(hashlib.sha256((model + prompt).encode("utf-8")).hexdigest()[:4], 16) % 11
+    if json_output:
+        content = json.dumps({"평가": "Mock judgement.", "점수": score}, ensure_ascii=False)
+        # 잘린 JSON 처럼 점수 없이 끝나는 응답
+        return content[: content.index("점수")] if malformed else content
+    if malformed:
+        return "평가: Mock judgement."
+    return f"평가: Mock judgement.\n\n점수: {score}"
+
+
+def parse_latency(spec: str):
+    """Parse `fixed:MS`, `uniform:LOW,HIGH`, `lognormal:MEDIAN,SIGMA` or `exponential:MEAN` (milliseconds)."""
+    name, _, params = spec.partition(":")
+    if name not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution '{name}' (allowed: {', '.join(LATENCY_DISTRIBUTIONS)})")
+    values = [float(value) for value in params.split(",")] if params else []
+    if len(values) != LATENCY_DISTRIBUTIONS[name]:
+        raise ValueError(f"Latency '{spec}' needs {LATENCY_DISTRIBUTIONS[name]} parameter(s)")
+    return name, values
+
+
+class MockProfile:
+    """Load profile of the mock server: latency distribution, capacity and injected 429s / malformed outputs.
+
+    Random draws are seeded from (seed, prompt, how many times that prompt was seen), so a profile
+    replays the same latencies and failures for the same workload whatever the request order.
+    Only the capacity limit depends on timing.
+    """
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        retry_after_ms: int = None,
+        capacity: int = None,
+        seed: int = 0,
+    ):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after_ms = retry_after_ms
+        self.capacity = capacity
+        self.seed = seed
+        self.lock = Lock()
+        self.seen = Counter()
+        self.in_flight = 0
+        self.stats = Counter()
+
+    def rng(self, prompt: str) -> random.Random:
+        with self.lock:
+            occurrence = self.seen[prompt]
+            self.seen[prompt] += 1
+        return random.Random(hashlib.sha256(f"{self.seed}\0{occurrence}\0{prompt}".encode("utf-8")).digest())
+
+    def sample_latency(self, rng: random.Random) -> float:
+        name, values = self.latency
+        if name == "fixed":
+            milliseconds = values[0]
+        elif name == "uniform":
+            milliseconds = rng.uniform(*values)
+        elif name == "lognormal":
+            milliseconds = rng.lognormvariate(math.log(values[0]), values[1])
+        else:
+            milliseconds = rng.expovariate(1 / values[0])
+        return milliseconds / 1000
+
+    def enter(self) -> bool:
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.capacity is not None and self.in_flight >= self.capacity:
+                self.stats["throttled"] += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def count(self, name: str):
+        with self.lock:
+            self.stats[name] += 1
+
+
+def mock_chat_completion(body: dict, malformed: bool = False) -> dict:
+    prompt = body["messages"][-1]["content"]
+    json_output = (body.get("response_format") or {}).get("type") == "json_object"
+    content = mock_judge_content(prompt, json_output, body.get("model", ""), malformed)
+    prompt_tokens = sum(len(message["content"]) for message in body["messages"])
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [
+            {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}},
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content),
+            "total_tokens": prompt_tokens + len(content),
+        },
+    }
+
+
+class MockState:
+    def __init__(self):
+        self.files = {}
+        self.batches = {}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible endpoints: chat completions, files and batches."""
+
+    # keep-alive 로 요청마다 새 연결을 맺지 않도록 함 (모든 응답에 Content-Length 를 보냄)
+    protocol_version = "HTTP/1.1"
+    state = MockState()
+    profile = MockProfile()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_bytes(self, data: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            self._chat_completion(json.loads(self._read_body()))
+        elif path.endswith("/files"):
+            self._create_file()
+        elif path.endswith("/batches"):
+            self._create_batch(json.loads(self._read_body()))
+        else:
+            # keep-alive 연결에 본문이 남지 않도록 읽고 버림
+            self._read_body()
+            self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[-2:] == ["mock", "stats"]:
+            self._send_json(dict(self.profile.stats))
+        elif len(parts) >= 2 and parts[-2] == "batches":
+            self._retrieve_batch(parts[-1])
+        elif len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+            self._send_bytes(self.state.files[parts[-2]]["content"])
+        else:
+            self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+    def _send_rate_limit(self):
+        headers = {}
+        if self.profile.retry_after_ms is not None:
+            headers["retry-after-ms"] = str(self.profile.retry_after_ms)
+        error = {"message": "Rate limit reached (mock)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}
+        self._send_json({"error": error}, status=429, headers=headers)
+
+    def _chat_completion(self, body: dict):
+        profile = self.profile
+        # 지연 -> 429 -> 잘못된 출력 순으로 항상 같은 개수를 뽑아 재현성을 유지
+        rng = profile.rng(body["messages"][-1]["content"])
+        latency = profile.sample_latency(rng)
+        throttle = rng.random() < profile.error_rate
+        malformed = rng.random() < profile.malformed_rate
+
+        # 429 는 실제 API 처럼 지연 없이 바로 응답
+        if throttle:
+            profile.count("requests")
+            profile.count("throttled")
+            self._send_rate_limit()
+            return
+        if not profile.enter():
+            self._send_rate_limit()
+            return
+        try:
+            time.sleep(latency)
+        finally:
+            profile.leave()
+        if malformed:
+            profile.count("malformed")
+        self._send_json(mock_chat_completion(body, malformed))
+
+    def _create_file(self):
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+        message = email.message_from_bytes(header + self._read_body(), policy=policy.HTTP)
+        fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+        upload = fields["file"]
+        file_object = self._store_file(upload.get_content(), upload.get_filename() or "upload.jsonl", "batch")
+        self._send_json(file_object)
+
+    def _store_file(self, content, filename: str, purpose: str) -> dict:
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        file_id = f"file-{uuid.uuid4().hex}"
+        file_object = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        self.state.files[file_id] = {"object": file_object, "content": content}
+        return file_object
+
+    def _create_batch(self, body: dict):
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        self.state.batches[batch_id] = batch
+        self._send_json(batch)
+
+    def _retrieve_batch(self, batch_id: str):
+        batch = self.state.batches[batch_id]
+        # 첫 조회까지는 in_progress 로 응답하여 클라이언트의 polling 경로를 거치게 함
+        if batch["status"] == "in_progress" and batch.get("polled"):
+            self._complete_batch(batch)
+        batch["polled"] = True
+        self._send_json({key: value for key, value in batch.items() if key != "polled"})
+
+    def _complete_batch(self, batch: dict):
+        lines = self.state.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+        outputs = []
+        for line in lines:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            outputs.append(
+                {
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": mock_chat_completion(request["body"])},
+                    "error": None,
+                }
+            )
+        content = "".join(json.dumps(output, ensure_ascii=False) + "\n" for output in outputs)
+        batch["output_file_id"] = self._store_file(content, f"{batch['id']}_output.jsonl", "batch_output")["id"]
+        batch["status"] = "completed"
+        batch["request_counts"] = {"total": len(outputs), "completed": len(outputs), "failed": 0}
+
+
+class MockServer(ThreadingHTTPServer):
+    # 기본 listen backlog(5)로는 동시 연결이 몰릴 때 연결이 끊겨 벤치마크에 잡음이 생김
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, profile: MockProfile = None) -> ThreadingHTTPServer:
+    if profile is not None:
+        MockHandler.profile = profile
+    server = MockServer((host, port), MockHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", help="Host to bind", default="127.0.0.1")
+    parser.add_argument("-p", "--port", help="Port to bind", default=8000, type=int)
+    parser.add_argument(
+        "--latency",
+        help="Latency distribution in ms: fixed:MS, uniform:LOW,HIGH, lognormal:MEDIAN,SIGMA or exponential:MEAN",
+        default="fixed:0",
+    )
+    parser.add_argument("--error-rate", help="Fraction of chat requests answered with 429", default=0.0, type=float)
+    parser.add_argument(
+        "--malformed-rate", help="Fraction of chat responses without a judge score", default=0.0, type=float
+    )
+    parser.add_argument("--retry-after-ms", help="retry-after-ms header sent with 429", default=None, type=int)
+    parser.add_argument("--capacity", help="Concurrent requests served before answering 429", default=None, type=int)
+    parser.add_argument("--seed", help="Seed of the latency/failure draws", default=0, type=int)
+    args = parser.parse_args()
+
+    MockHandler.profile = MockProfile(
+        args.latency, args.error_rate, args.malformed_rate, args.retry_after_ms, args.capacity, args.seed
+    )
+    server = MockServer((args.host, args.port), MockHandler)
+    print(f"- Mock OpenAI server : http://{args.host}:{server.server_port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from threading import Condition, Lock
+from typing import Optional
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute, bursting up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.refill_rate = per_minute / 60.0
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.refill_rate)
+
+    def adjust(self, amount: float):
+        # 실제 사용량을 알게 된 뒤 추정치와의 차이를 보정 (음수면 환불)
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """Shared requests-per-minute / tokens-per-minute budget for every judge call of a run."""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    async def acquire(self, estimated_tokens: int):
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(estimated_tokens)
+
+    def record_usage(self, estimated_tokens: int, used_tokens: Optional[int]):
+        if self.tokens is not None and used_tokens is not None:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+
+
+def estimate_tokens(*texts: str, max_output_tokens: int = 512) -> int:
+    # 한국어는 대략 글자당 1토큰 이하이므로 글자 수를 보수적인 상한으로 사용
+    return sum(len(text) for text in texts) + max_output_tokens
+
+
+class SyncRateLimiter:
+    """Blocking requests-per-minute limiter shared by worker threads, spacing calls evenly."""
+
+    def __init__(self, rpm: Optional[int] = None):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self.next_time = time.monotonic()
+        self.lock = Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def retry_after_seconds(error) -> Optional[float]:
+    """Seconds requested by a `Retry-After` / `retry-after-ms` header on an API error, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttle_error(error) -> bool:
+    # 429 와 5xx 는 서버 과부하 신호로 보고 동시 실행 수를 줄임
+    status_code = getattr(error, "status_code", None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+def backoff_delay(attempt: int, error=None, base: float = 2.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter, never shorter than the server's `Retry-After`."""
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class AIMDLimit:
+    """Additive-increase / multiplicative-decrease limit on in-flight requests.
+
+    Every success grows the limit by 1/limit (about +1 per window of requests) up to
+    `max_limit`; a 429/5xx halves it. Throttles from requests sent before the last decrease
+    are ignored, so a burst of rejections that were already in flight counts as a single
+    signal. With `adaptive=False` the limit stays fixed at `initial`.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        max_limit: Optional[int] = None,
+        min_limit: int = 1,
+        adaptive: bool = True,
+        decrease_factor: float = 0.5,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit or initial, initial)
+        self.limit = float(max(initial, min_limit))
+        self.adaptive = adaptive
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.last_decrease = 0.0
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _on_success(self):
+        if self.adaptive:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _on_throttle(self, started_at: float):
+        if not self.adaptive or started_at < self.last_decrease:
+            return
+        self.last_decrease = time.monotonic()
+        previous = int(self.limit)
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        print(f"- Throttled, concurrency {previous} -> {int(self.limit)}")
+
+
+class AdaptiveConcurrency(AIMDLimit):
+    """Thread-safe `AIMDLimit`; worker threads wait in `slot()` until the current limit allows them in."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.condition = Condition()
+
+    @contextmanager
+    def slot(self):
+        with self.condition:
+            self.condition.wait_for(self._has_slot)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def on_success(self):
+        with self.condition:
+            self._on_success()
+            self.condition.notify_all()
+
+    def on_throttle(self, started_at: float):
+        with self.condition:
+            self._on_throttle(started_at)
+
+
+class AsyncAdaptiveConcurrency(AIMDLimit):
+    """`AIMDLimit` for the asyncio engine, used as `async with concurrency:` in place of a semaphore."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(self._has_slot)
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        # 이벤트 루프 하나에서만 호출되므로 잠금 없이 갱신하고, 늘어난 슬롯은 다음 __aexit__ 에서 깨움
+        self._on_success()
+
+    def on_throttle(self, started_at: float):
+        self._on_throttle(started_at)
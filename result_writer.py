@@ -0,0 +1,122 @@
+import json
+import os
+import queue
+from pathlib import Path
+from threading import Thread
+from typing import Set, Tuple
+
+
+def scan_output_file(output_file: Path) -> Tuple[Set[int], int, bytes]:
+    """(ids with both judge results, end of the last parsable line, file contents). Read-only."""
+    if not output_file.exists():
+        return set(), 0, b""
+
+    data = output_file.read_bytes()
+    completed = set()
+    valid_end = 0
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        offset += len(line)
+        try:
+            row = json.loads(line.decode("utf-8-sig"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            continue
+        valid_end = offset
+        if isinstance(row.get("query_single"), dict) and isinstance(row.get("query_multi"), dict):
+            completed.add(row["id"])
+    return completed, valid_end, data
+
+
+def load_completed_ids(output_file: Path) -> Set[int]:
+    """Return ids that already have both judge results without modifying the file."""
+    return scan_output_file(output_file)[0]
+
+
+def repair_output_file(output_file: Path) -> Set[int]:
+    """Like `load_completed_ids`, but first cuts off a torn trailing line so appended rows start on a new line."""
+    completed, valid_end, data = scan_output_file(output_file)
+    # 쓰다가 중단된 마지막 줄은 잘라내야 이어 쓰는 줄과 섞이지 않음
+    if data and not data.endswith(b"\n"):
+        with output_file.open("r+b") as f:
+            if valid_end < len(data):
+                f.truncate(valid_end)
+            else:
+                f.seek(0, os.SEEK_END)
+                f.write(b"\n")
+    return completed
+
+
+class ResultWriter:
+    """Single writer thread that appends judged rows and fsyncs them in batches.
+
+    If the thread fails (e.g. disk full), the error is raised from the next `write` and from `close`
+    instead of rows being dropped silently.
+    """
+
+    def __init__(self, sync_every: int = 16, sync_interval: float = 1.0):
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.queue = queue.Queue()
+        self.files = {}
+        self.error = None
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, output_file: Path, row: dict):
+        self._raise_error()
+        self.queue.put((output_file, row))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        try:
+            self._write_rows()
+        except Exception as e:
+            self.error = e
+        finally:
+            for f in self.files.values():
+                try:
+                    f.close()
+                except OSError:
+                    pass
+            self.files.clear()
+
+    def _sync(self):
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_rows(self):
+        pending = 0
+        while True:
+            try:
+                item = self.queue.get(timeout=self.sync_interval)
+            except queue.Empty:
+                if pending:
+                    self._sync()
+                    pending = 0
+                continue
+
+            if item is None:
+                break
+
+            output_file, row = item
+            f = self.files.get(output_file)
+            if f is None:
+                f = self.files[output_file] = output_file.open("a", encoding="utf-8-sig")
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+
+            pending += 1
+            if pending >= self.sync_every:
+                self._sync()
+                pending = 0
+
+        self._sync()
@@ -0,0 +1,77 @@
+import heapq
+import itertools
+from threading import Lock, Thread
+from typing import Callable, Dict, Hashable, Iterable, Sequence, Tuple
+
+
+class WorkItemScheduler:
+    """Runs every (row, turn) pair as its own work item on a pool of threads.
+
+    A row is handed to `on_row_done` as soon as all of its turns are judged. Every turn of every
+    row is queued up front, so the turns of one row run concurrently; once a turn finishes, the
+    row's remaining turns move ahead of untouched rows, so output lines flush early instead of
+    piling up at the end of a file. An exception in `judge_fn` or `on_row_done` stops the pool
+    and is re-raised from `run`.
+    """
+
+    def __init__(
+        self,
+        judge_fn: Callable[[dict, str], dict],
+        on_row_done: Callable[[dict, Dict[str, dict]], None],
+        threads: int,
+        turns: Sequence[str] = ("single", "multi"),
+    ):
+        self.judge_fn = judge_fn
+        self.on_row_done = on_row_done
+        self.threads = threads
+        self.turns = tuple(turns)
+
+    def run(self, rows: Iterable[Tuple[Hashable, dict]]):
+        lock = Lock()
+        counter = itertools.count()
+        heap = []
+        states = {}
+        errors = []
+        for key, row in rows:
+            states[key] = {"row": row, "answers": {}, "started": set()}
+            for turn in self.turns:
+                heapq.heappush(heap, (1, next(counter), key, turn))
+
+        def worker():
+            while True:
+                with lock:
+                    # 우선순위를 올리며 다시 넣은 turn 의 이전 항목은 건너뜀
+                    while heap and heap[0][3] in states[heap[0][2]]["started"]:
+                        heapq.heappop(heap)
+                    if not heap or errors:
+                        return
+                    _, _, key, turn = heapq.heappop(heap)
+                    state = states[key]
+                    state["started"].add(turn)
+
+                try:
+                    answer = self.judge_fn(state["row"], turn)
+
+                    with lock:
+                        state["answers"][turn] = answer
+                        n_done = len(state["answers"])
+                        # 시작된 행의 남은 turn 을 새 행보다 먼저 처리해 행이 빨리 완성되도록 함
+                        for remaining in self.turns:
+                            if remaining not in state["started"]:
+                                heapq.heappush(heap, (0, next(counter), key, remaining))
+
+                    if n_done == len(self.turns):
+                        self.on_row_done(state["row"], state["answers"])
+                except Exception as e:
+                    print(f"Work item failed ({key}, {turn}): {e!r}")
+                    with lock:
+                        errors.append(e)
+                    return
+
+        workers = [Thread(target=worker, daemon=True) for _ in range(max(1, self.threads))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        if errors:
+            raise errors[0]
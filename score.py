@@ -1,67 +1,235 @@
 import argparse
+import csv
 import glob
+import json
+from pathlib import Path
 
-import pandas as pd
-
-# 파일 경로 패턴
-# file_pattern = './judge_20240418_103542.jsonl'
-parser = argparse.ArgumentParser()
-parser.add_argument("-p", "--print", help="judge Output File Location", default=None)
-args = parser.parse_args()
-
-if args.print is None:
-    raise ValueError("Judge Output File Location is required")
-
-# 카테고리별 점수 집계를 위한 딕셔너리
-category_scores = {}
-
-# 전체 싱글 점수와 멀티 점수의 리스트
-total_single_scores = []
-total_multi_scores = []
-
-# 지정된 패턴에 맞는 모든 파일을 찾아서 처리
-for file_path in glob.glob(args.print):
-    file = pd.read_json(file_path, orient="records", encoding="utf-8-sig", lines=True)
-    for item in file.to_dict(orient="records"):
-        category = item["category"]
-        single_score = item["query_single"]["judge_score"]
-        multi_score = item["query_multi"]["judge_score"]
-
-        if category not in category_scores:
-            category_scores[category] = {"single_scores": [], "multi_scores": []}
-
-        category_scores[category]["single_scores"].append(single_score)
-        category_scores[category]["multi_scores"].append(multi_score)
-
-        # 전체 점수 리스트에 추가
-        total_single_scores.append(single_score)
-        total_multi_scores.append(multi_score)
-
-# 표의 헤더 생성
-table_header = "| Category | Single turn | Multi turn |\n|---|---|---|"
-
-# 표의 내용 생성
-table_rows = []
-for category, scores in category_scores.items():
-    avg_single = sum(scores["single_scores"]) / len(scores["single_scores"])
-    avg_multi = sum(scores["multi_scores"]) / len(scores["multi_scores"])
-    table_rows.append(f"| {category} | {avg_single:.2f} | {avg_multi:.2f} |")
-
-    total_single_scores.extend(scores["single_scores"])
-    total_multi_scores.extend(scores["multi_scores"])
-
-# 카테고리별 점수 평균 출력
-print(table_header)
-for row in table_rows:
-    print(row)
-
-# 전체 점수의 평균 계산 및 출력
-avg_total_single = sum(total_single_scores) / len(total_single_scores)
-avg_total_multi = sum(total_multi_scores) / len(total_multi_scores)
-avg_total = (avg_total_single + avg_total_multi) / 2
-
-# 전체 점수 평균 출력
-print("\n| Category | Score |\n|---|---|")
-print(f"| Single turn | {avg_total_single:.2f} |")
-print(f"| Multi turn | {avg_total_multi:.2f} |")
-print(f"| Overall | {avg_total:.2f} |")
+# orjson 이 설치되어 있으면 더 빠른 파서를 사용
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+BOM = b"\xef\xbb\xbf"
+
+
+def iter_rows(file_path):
+    with open(file_path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(BOM):
+                line = line[len(BOM) :]
+            if not line:
+                continue
+            yield json_loads(line)
+
+
+def iter_scores(file_path):
+    """Yield (category, single_score, multi_score) for each judged row, one line at a time."""
+    for item in iter_rows(file_path):
+        yield item["category"], item["query_single"]["judge_score"], item["query_multi"]["judge_score"]
+
+
+def iter_evaluated_files(evaluated_dir):
+    """Yield (file_path, model, strategy) for every <model>/<strategy>.jsonl under `evaluated_dir`."""
+    evaluated_dir = Path(evaluated_dir)
+    for file_path in sorted(evaluated_dir.rglob("*.jsonl")):
+        relative_path = file_path.relative_to(evaluated_dir)
+        if any(part.startswith(".") for part in relative_path.parts):
+            continue
+        yield file_path, relative_path.parent.as_posix(), file_path.stem
+
+
+class ScoreAccumulator:
+    """Running sums and counts per category, so no score lists are kept in memory."""
+
+    def __init__(self):
+        self.categories = {}
+
+    def add(self, category, single_score, multi_score):
+        totals = self.categories.get(category)
+        if totals is None:
+            totals = self.categories[category] = [0.0, 0.0, 0]
+        totals[0] += single_score
+        totals[1] += multi_score
+        totals[2] += 1
+
+    def add_file(self, file_path):
+        for category, single_score, multi_score in iter_scores(file_path):
+            self.add(category, single_score, multi_score)
+
+    def category_averages(self):
+        return {
+            category: (single_sum / count, multi_sum / count)
+            for category, (single_sum, multi_sum, count) in self.categories.items()
+        }
+
+    def total_averages(self):
+        single_sum = sum(totals[0] for totals in self.categories.values())
+        multi_sum = sum(totals[1] for totals in self.categories.values())
+        count = sum(totals[2] for totals in self.categories.values())
+        avg_single = single_sum / count
+        avg_multi = multi_sum / count
+        return avg_single, avg_multi, (avg_single + avg_multi) / 2
+
+
+def print_score_tables(accumulator: ScoreAccumulator):
+    # 카테고리별 점수 평균 출력
+    print("| Category | Single turn | Multi turn |\n|---|---|---|")
+    for category, (avg_single, avg_multi) in accumulator.category_averages().items():
+        print(f"| {category} | {avg_single:.2f} | {avg_multi:.2f} |")
+
+    # 전체 점수 평균 출력
+    avg_total_single, avg_total_multi, avg_total = accumulator.total_averages()
+    print("\n| Category | Score |\n|---|---|")
+    print(f"| Single turn | {avg_total_single:.2f} |")
+    print(f"| Multi turn | {avg_total_multi:.2f} |")
+    print(f"| Overall | {avg_total:.2f} |")
+
+
+def build_leaderboard(evaluated_dir):
+    """Aggregate every <model>/<strategy>.jsonl under `evaluated_dir` (or a columnar store) in one pass."""
+    if Path(evaluated_dir).is_file():
+        from columnar_store import ColumnarStore
+
+        return leaderboard_rows(ColumnarStore(evaluated_dir).score_accumulators())
+
+    accumulators = {}
+    for file_path, model, strategy in iter_evaluated_files(evaluated_dir):
+        accumulators.setdefault((model, strategy), ScoreAccumulator()).add_file(file_path)
+    return leaderboard_rows(accumulators)
+
+
+def leaderboard_rows(accumulators):
+    categories = sorted({category for acc in accumulators.values() for category in acc.categories})
+    rows = []
+    for (model, strategy), accumulator in accumulators.items():
+        if not accumulator.categories:
+            continue
+        avg_single, avg_multi, avg_total = accumulator.total_averages()
+        averages = accumulator.category_averages()
+        row = {"model": model, "strategy": strategy, "single": avg_single, "multi": avg_multi, "overall": avg_total}
+        for category in categories:
+            if category in averages:
+                row[category] = sum(averages[category]) / 2
+        rows.append(row)
+
+    rows.sort(key=lambda row: row["overall"], reverse=True)
+    return rows, categories
+
+
+def print_leaderboard(rows, categories, show_rows=False):
+    columns = ["model", "strategy"] + (["rows"] if show_rows else []) + ["single", "multi", "overall"] + categories
+    print("| # | " + " | ".join(columns) + " |")
+    print("|---" * (len(columns) + 1) + "|")
+    for rank, row in enumerate(rows, start=1):
+        cells = [
+            str(row[column]) if column in ("model", "strategy", "rows") else f"{row.get(column, float('nan')):.2f}"
+            for column in columns
+        ]
+        print(f"| {rank} | " + " | ".join(cells) + " |")
+
+
+def export_leaderboard(rows, categories, csv_path=None, json_path=None):
+    if csv_path:
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["model", "strategy", "single", "multi", "overall"] + categories)
+            writer.writeheader()
+            writer.writerows(rows)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", "--print", help="judge Output File Location", default=None)
+    parser.add_argument(
+        "-l",
+        "--leaderboard",
+        help="Aggregate every model/strategy under this directory or columnar store (.parquet)",
+        default=None,
+    )
+    parser.add_argument("--csv", help="Export leaderboard to CSV", default=None)
+    parser.add_argument("--json", help="Export leaderboard to JSON", default=None)
+    parser.add_argument(
+        "-i", "--index", help="Answer queries from a score index (.npz), updated in place", default=None
+    )
+    parser.add_argument("--evaluated-dir", help="Judge output root covered by the index", default="./evaluated")
+    parser.add_argument("-m", "--model", help="Model to query from the index", default=None)
+    parser.add_argument("-s", "--strategy", help="Strategy to query from the index", default=None)
+    parser.add_argument(
+        "--stats", help="Bootstrap CIs and paired permutation tests over all models", action="store_true"
+    )
+    parser.add_argument("--resamples", help="Bootstrap / permutation resamples", default=10000, type=int)
+    parser.add_argument("--alpha", help="Significance level for confidence intervals", default=0.05, type=float)
+    parser.add_argument("--seed", help="Random seed for resampling", default=0, type=int)
+    parser.add_argument(
+        "-w", "--watch", help="Keep the leaderboard live while judge outputs are appended", action="store_true"
+    )
+    parser.add_argument("--interval", help="Seconds between polls in --watch mode", default=1.0, type=float)
+    args = parser.parse_args(argv)
+
+    if args.watch:
+        from score_watch import watch
+
+        watch(args.leaderboard or args.evaluated_dir, args.interval, json_path=args.json)
+        return
+
+    index = None
+    if args.index is not None or args.stats:
+        from score_index import ScoreIndex
+
+        if Path(args.leaderboard or args.evaluated_dir).is_file():
+            # 점수 인덱스는 JSONL 트리에서만 만듦
+            parser.error("-i/--stats need a JSONL tree; write the store back with `store import` first")
+
+        index = ScoreIndex.update(args.leaderboard or args.evaluated_dir, args.index)
+
+    if args.stats:
+        from score_stats import print_stats
+
+        try:
+            print_stats(index, args.strategy, args.resamples, args.alpha, args.seed)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
+    if args.leaderboard is not None:
+        if index is not None:
+            rows, categories = leaderboard_rows(index.accumulators())
+        else:
+            rows, categories = build_leaderboard(args.leaderboard)
+        print_leaderboard(rows, categories)
+        export_leaderboard(rows, categories, csv_path=args.csv, json_path=args.json)
+        return
+
+    if index is not None and (args.print is not None or args.model is not None or args.strategy is not None):
+        files = glob.glob(args.print) if args.print is not None else None
+        missing = index.missing_files(files) if files is not None else []
+        if missing:
+            # 인덱스 밖의 파일은 아래에서 파일을 직접 읽어 집계
+            print(
+                f"- --evaluated-dir 밖의 파일 {len(missing)}개가 있어 인덱스 대신 파일을 직접 읽음 (예: {missing[0]})"
+            )
+        else:
+            rows = index.select(files=files, model=args.model, strategy=args.strategy)
+            if not len(rows):
+                parser.error("no judged rows in the index match the given -p/-m/-s")
+            print_score_tables(index.accumulate(rows))
+            return
+
+    if args.print is None:
+        raise ValueError("Judge Output File Location is required")
+
+    # 지정된 패턴에 맞는 모든 파일을 찾아서 처리
+    accumulator = ScoreAccumulator()
+    for file_path in glob.glob(args.print):
+        accumulator.add_file(file_path)
+    print_score_tables(accumulator)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from score import ScoreAccumulator, iter_evaluated_files, iter_rows
+
+INDEX_VERSION = 1
+COLUMNS = ("model", "strategy", "id", "category", "single", "multi")
+
+
+class ScoreIndex:
+    """Columnar (model, strategy, id, category, single, multi) arrays extracted from evaluated/ JSONL.
+
+    String columns are stored as small integer codes into `models`, `strategies` and `categories`.
+    `files`, `mtimes`, `sizes`, `starts` and `counts` record where each source file's rows live,
+    so `update` only re-parses files whose mtime or size changed.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["arrays"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @classmethod
+    def empty(cls) -> "ScoreIndex":
+        return cls(
+            {
+                "model": np.empty(0, dtype=np.int32),
+                "strategy": np.empty(0, dtype=np.int16),
+                "id": np.empty(0, dtype=np.int32),
+                "category": np.empty(0, dtype=np.int16),
+                "single": np.empty(0, dtype=np.float32),
+                "multi": np.empty(0, dtype=np.float32),
+                "models": np.empty(0, dtype=str),
+                "strategies": np.empty(0, dtype=str),
+                "categories": np.empty(0, dtype=str),
+                "files": np.empty(0, dtype=str),
+                "mtimes": np.empty(0, dtype=np.int64),
+                "sizes": np.empty(0, dtype=np.int64),
+                "starts": np.empty(0, dtype=np.int64),
+                "counts": np.empty(0, dtype=np.int64),
+            }
+        )
+
+    @classmethod
+    def load(cls, index_path) -> "ScoreIndex":
+        if index_path is None or not Path(index_path).exists():
+            return cls.empty()
+        with np.load(index_path, allow_pickle=False) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                return cls.empty()
+            return cls({key: data[key] for key in data.files if key != "version"})
+
+    def save(self, index_path):
+        index_path = Path(index_path)
+        tmp_path = index_path.with_name(index_path.name + ".tmp.npz")
+        np.savez(tmp_path, version=np.int32(INDEX_VERSION), **self.arrays)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def update(cls, evaluated_dir, index_path) -> "ScoreIndex":
+        """Load the index at `index_path`, re-parse only new or modified files and save it back.
+
+        With `index_path=None` the index is built in memory only.
+        """
+        old = cls.load(index_path)
+        old_files = {path: i for i, path in enumerate(old.files.tolist())}
+        names = {
+            "models": old.models.tolist(),
+            "strategies": old.strategies.tolist(),
+            "categories": old.categories.tolist(),
+        }
+        codes = {key: {name: code for code, name in enumerate(values)} for key, values in names.items()}
+
+        def encode(key, name):
+            if name not in codes[key]:
+                codes[key][name] = len(names[key])
+                names[key].append(name)
+            return codes[key][name]
+
+        chunks = {column: [] for column in COLUMNS}
+        manifest = {"files": [], "mtimes": [], "sizes": [], "starts": [], "counts": []}
+        total = 0
+        reparsed = 0
+        for file_path, model, strategy in iter_evaluated_files(evaluated_dir):
+            stat = file_path.stat()
+            key = file_path.as_posix()
+            i = old_files.get(key)
+            if i is not None and old.mtimes[i] == stat.st_mtime_ns and old.sizes[i] == stat.st_size:
+                rows = slice(old.starts[i], old.starts[i] + old.counts[i])
+                for column in COLUMNS:
+                    chunks[column].append(old.arrays[column][rows])
+                count = int(old.counts[i])
+            else:
+                reparsed += 1
+                ids, categories, singles, multis = [], [], [], []
+                for item in iter_rows(file_path):
+                    ids.append(item["id"])
+                    categories.append(encode("categories", item["category"]))
+                    singles.append(item["query_single"]["judge_score"])
+                    multis.append(item["query_multi"]["judge_score"])
+                count = len(ids)
+                chunks["model"].append(np.full(count, encode("models", model), dtype=np.int32))
+                chunks["strategy"].append(np.full(count, encode("strategies", strategy), dtype=np.int16))
+                chunks["id"].append(np.asarray(ids, dtype=np.int32))
+                chunks["category"].append(np.asarray(categories, dtype=np.int16))
+                chunks["single"].append(np.asarray(singles, dtype=np.float32))
+                chunks["multi"].append(np.asarray(multis, dtype=np.float32))
+
+            manifest["files"].append(key)
+            manifest["mtimes"].append(stat.st_mtime_ns)
+            manifest["sizes"].append(stat.st_size)
+            manifest["starts"].append(total)
+            manifest["counts"].append(count)
+            total += count
+
+        index = cls.empty()
+        for column in COLUMNS:
+            if chunks[column]:
+                index.arrays[column] = np.concatenate(chunks[column]).astype(index.arrays[column].dtype)
+        for key, values in names.items():
+            index.arrays[key] = np.asarray(values, dtype=str)
+        index.arrays["files"] = np.asarray(manifest["files"], dtype=str)
+        for key in ("mtimes", "sizes", "starts", "counts"):
+            index.arrays[key] = np.asarray(manifest[key], dtype=np.int64)
+
+        if index_path is not None and (reparsed or len(old_files) != len(manifest["files"])):
+            index.save(index_path)
+        return index
+
+    def select(
+        self, files: Optional[Iterable] = None, model: Optional[str] = None, strategy: Optional[str] = None
+    ) -> np.ndarray:
+        """Indices of the matching rows; with `files`, grouped in the order the files are given."""
+        mask = np.ones(len(self.single), dtype=bool)
+        if model is not None:
+            models = self.models.tolist()
+            mask &= self.model == (models.index(model) if model in models else -1)
+        if strategy is not None:
+            strategies = self.strategies.tolist()
+            mask &= self.strategy == (strategies.index(strategy) if strategy in strategies else -1)
+        if files is None:
+            return np.flatnonzero(mask)
+
+        positions = {Path(path).resolve(): i for i, path in enumerate(self.files.tolist())}
+        chunks = []
+        for path in dict.fromkeys(Path(path).resolve() for path in files):
+            i = positions.get(path)
+            if i is not None:
+                rows = np.arange(self.starts[i], self.starts[i] + self.counts[i])
+                chunks.append(rows[mask[rows]])
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def missing_files(self, files: Iterable) -> list:
+        """Paths among `files` that are not covered by the index."""
+        indexed = {Path(path).resolve() for path in self.files.tolist()}
+        return [path for path in files if Path(path).resolve() not in indexed]
+
+    def accumulate(self, rows: np.ndarray) -> ScoreAccumulator:
+        n_categories = len(self.categories)
+        category = self.category[rows]
+        counts = np.bincount(category, minlength=n_categories)
+        single_sums = np.bincount(category, weights=self.single[rows], minlength=n_categories)
+        multi_sums = np.bincount(category, weights=self.multi[rows], minlength=n_categories)
+
+        # 카테고리는 파일을 한 줄씩 읽는 경로와 같이 처음 나온 순서대로
+        codes, first_rows = np.unique(category, return_index=True)
+        categories = self.categories.tolist()
+        accumulator = ScoreAccumulator()
+        for code in codes[np.argsort(first_rows)]:
+            accumulator.categories[categories[code]] = [
+                float(single_sums[code]),
+                float(multi_sums[code]),
+                int(counts[code]),
+            ]
+        return accumulator
+
+    def accumulators(self) -> Dict[tuple, ScoreAccumulator]:
+        """Per (model, strategy) accumulators computed with one grouped bincount."""
+        n_strategies = max(len(self.strategies), 1)
+        n_categories = max(len(self.categories), 1)
+        group = (self.model.astype(np.int64) * n_strategies + self.strategy) * n_categories + self.category
+        size = len(self.models) * n_strategies * n_categories
+        counts = np.bincount(group, minlength=size).reshape(-1, n_categories)
+        single_sums = np.bincount(group, weights=self.single, minlength=size).reshape(-1, n_categories)
+        multi_sums = np.bincount(group, weights=self.multi, minlength=size).reshape(-1, n_categories)
+
+        models, strategies, categories = self.models.tolist(), self.strategies.tolist(), self.categories.tolist()
+        accumulators = {}
+        for pair in np.flatnonzero(counts.sum(axis=1)):
+            accumulator = ScoreAccumulator()
+            for code in np.flatnonzero(counts[pair]):
+                accumulator.categories[categories[code]] = [
+                    float(single_sums[pair, code]),
+                    float(multi_sums[pair, code]),
+                    int(counts[pair, code]),
+                ]
+            accumulators[(models[pair // n_strategies], strategies[pair % n_strategies])] = accumulator
+        return accumulators
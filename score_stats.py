@@ -0,0 +1,119 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from score_index import ScoreIndex
+
+
+def score_matrix(index: ScoreIndex, strategy: Optional[str] = None):
+    """Build a (systems x questions) matrix of per-question scores, (single + multi) / 2.
+
+    Systems are (model, strategy) pairs. Systems missing any question are dropped, since the
+    paired tests below need every system scored on the same questions.
+    """
+    mask = index.select(strategy=strategy)
+    n_strategies = max(len(index.strategies), 1)
+    system_codes = index.model[mask].astype(np.int64) * n_strategies + index.strategy[mask]
+    unique_systems, system_pos = np.unique(system_codes, return_inverse=True)
+    question_ids, question_pos = np.unique(index.id[mask], return_inverse=True)
+
+    matrix = np.full((len(unique_systems), len(question_ids)), np.nan)
+    matrix[system_pos, question_pos] = (index.single[mask] + index.multi[mask]) / 2
+    question_categories = np.zeros(len(question_ids), dtype=np.int64)
+    question_categories[question_pos] = index.category[mask]
+
+    complete = ~np.isnan(matrix).any(axis=1)
+    models, strategies = index.models.tolist(), index.strategies.tolist()
+    systems = [(models[code // n_strategies], strategies[code % n_strategies]) for code in unique_systems[complete]]
+    dropped = [(models[code // n_strategies], strategies[code % n_strategies]) for code in unique_systems[~complete]]
+    return systems, dropped, matrix[complete], question_categories
+
+
+def bootstrap_ci(
+    matrix: np.ndarray, n_resamples: int, alpha: float, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Percentile bootstrap CI of the mean for every row of `matrix` at once.
+
+    Each resample is drawn as multinomial question counts shared by all systems, so the whole
+    bootstrap is a single (systems x questions) @ (questions x resamples) product.
+    """
+    n_questions = matrix.shape[1]
+    counts = rng.multinomial(n_questions, np.full(n_questions, 1 / n_questions), size=n_resamples)
+    resampled_means = matrix @ counts.T / n_questions
+    low, high = np.percentile(resampled_means, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=1)
+    return matrix.mean(axis=1), low, high
+
+
+def category_bootstrap_ci(
+    matrix: np.ndarray, question_categories: np.ndarray, n_resamples: int, alpha: float, rng: np.random.Generator
+) -> Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    return {
+        int(category): bootstrap_ci(matrix[:, question_categories == category], n_resamples, alpha, rng)
+        for category in np.unique(question_categories)
+    }
+
+
+def paired_permutation_test(
+    matrix: np.ndarray,
+    pairs: List[Tuple[int, int]],
+    n_resamples: int,
+    rng: np.random.Generator,
+    chunk_size: int = 1024,
+) -> np.ndarray:
+    """Two-sided paired sign-flip permutation test of mean(matrix[a] - matrix[b]) for every pair.
+
+    All pairs share the same random sign matrix; pairs are processed in chunks so memory stays
+    bounded at chunk_size x n_resamples.
+    """
+    if not pairs:
+        return np.empty(0)
+    n_questions = matrix.shape[1]
+    signs = rng.choice(np.array([-1.0, 1.0]), size=(n_resamples, n_questions))
+    pairs = np.asarray(pairs)
+    p_values = np.empty(len(pairs))
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start : start + chunk_size]
+        differences = matrix[chunk[:, 0]] - matrix[chunk[:, 1]]
+        observed = np.abs(differences.mean(axis=1))
+        permuted = np.abs(differences @ signs.T) / n_questions
+        # 관측값 자체도 하나의 순열로 포함하여 p-value 가 0 이 되지 않도록 함
+        p_values[start : start + len(chunk)] = ((permuted >= observed[:, None] - 1e-12).sum(axis=1) + 1) / (
+            n_resamples + 1
+        )
+    return p_values
+
+
+def print_stats(index: ScoreIndex, strategy: Optional[str], n_resamples: int, alpha: float, seed: int):
+    rng = np.random.default_rng(seed)
+    systems, dropped, matrix, question_categories = score_matrix(index, strategy=strategy)
+    for model, system_strategy in dropped:
+        print(f"- 일부 문항 누락으로 제외 : {model} / {system_strategy}")
+    if not systems or not matrix.shape[1]:
+        raise ValueError("no model/strategy has judged rows for every question (check -s and the evaluated tree)")
+
+    means, low, high = bootstrap_ci(matrix, n_resamples, alpha, rng)
+    order = np.argsort(-means)
+    confidence = f"{100 * (1 - alpha):g}%"
+
+    print(f"| # | model | strategy | mean | {confidence} CI | p vs next |\n|---|---|---|---|---|---|")
+    adjacent_pairs = list(zip(order[:-1], order[1:]))
+    p_values = paired_permutation_test(matrix, adjacent_pairs, n_resamples, rng)
+    for rank, system in enumerate(order, start=1):
+        model, system_strategy = systems[system]
+        p_value = f"{p_values[rank - 1]:.3f}" if rank <= len(p_values) else "-"
+        print(
+            f"| {rank} | {model} | {system_strategy} | {means[system]:.2f} "
+            f"| [{low[system]:.2f}, {high[system]:.2f}] | {p_value} |"
+        )
+
+    categories = index.categories.tolist()
+    category_cis = category_bootstrap_ci(matrix, question_categories, n_resamples, alpha, rng)
+    print("\n| model | strategy | " + " | ".join(categories[code] for code in category_cis) + " |")
+    print("|---|---|" + "---|" * len(category_cis))
+    for system in order:
+        model, system_strategy = systems[system]
+        cells = [
+            f"{means_c[system]:.2f} [{low_c[system]:.2f}, {high_c[system]:.2f}]"
+            for means_c, low_c, high_c in category_cis.values()
+        ]
+        print(f"| {model} | {system_strategy} | " + " | ".join(cells) + " |")
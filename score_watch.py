@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+from score import BOM, ScoreAccumulator, iter_evaluated_files, json_loads, leaderboard_rows, print_leaderboard
+
+
+class FileTail:
+    """Read position in one growing JSONL file and the running scores of the rows read so far."""
+
+    def __init__(self):
+        self.offset = 0
+        self.inode = None
+        self.accumulator = ScoreAccumulator()
+        self.rows = 0
+        self.bad_lines = 0
+
+    def reset(self):
+        self.__init__()
+
+
+class LeaderboardWatcher:
+    """Keeps a leaderboard of `evaluated_dir` current while files are being appended.
+
+    Each poll reads only the bytes added since the last one, up to the last complete line (a
+    row still being written is picked up on the next poll). A file that shrank or was replaced -
+    e.g. `--resume` cutting a torn line, or a rerun writing it anew - is read again from the start.
+    A complete line that is not a valid row is counted in `bad_lines` and skipped.
+    """
+
+    def __init__(self, evaluated_dir):
+        self.evaluated_dir = Path(evaluated_dir)
+        self.tails: Dict[Tuple[str, str], FileTail] = {}
+
+    def poll(self) -> int:
+        """Read new rows from every file; returns the number of rows added."""
+        added = 0
+        for file_path, model, strategy in iter_evaluated_files(self.evaluated_dir):
+            tail = self.tails.setdefault((model, strategy), FileTail())
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            if stat.st_size < tail.offset or stat.st_ino != tail.inode:
+                tail.reset()
+                tail.inode = stat.st_ino
+            if stat.st_size > tail.offset:
+                added += self._read(file_path, tail)
+        return added
+
+    def _read(self, file_path: Path, tail: FileTail) -> int:
+        with open(file_path, "rb") as f:
+            f.seek(tail.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        added = 0
+        for line in data[:end].splitlines():
+            line = line.strip()
+            if line.startswith(BOM):
+                line = line[len(BOM) :]
+            if not line:
+                continue
+            try:
+                item = json_loads(line)
+                single, multi = item.get("query_single"), item.get("query_multi")
+                # 아직 두 turn 이 모두 평가되지 않은 행은 점수에 넣지 않음
+                if not isinstance(single, dict) or not isinstance(multi, dict):
+                    continue
+                tail.accumulator.add(item["category"], float(single["judge_score"]), float(multi["judge_score"]))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                # 다 쓰였지만 깨진 줄 하나 때문에 watch 가 멈추지 않도록 세고 넘어감
+                tail.bad_lines += 1
+                continue
+            tail.rows += 1
+            added += 1
+        tail.offset += end
+        return added
+
+    def bad_lines(self) -> int:
+        return sum(tail.bad_lines for tail in self.tails.values())
+
+    def leaderboard(self):
+        rows, categories = leaderboard_rows({key: tail.accumulator for key, tail in self.tails.items()})
+        for row in rows:
+            row["rows"] = self.tails[(row["model"], row["strategy"])].rows
+        return rows, categories
+
+
+def write_json(rows, path):
+    # 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 임시 파일에 쓰고 교체
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def watch(evaluated_dir, interval: float = 1.0, json_path=None):
+    """Poll `evaluated_dir` every `interval` seconds and redraw the leaderboard whenever rows arrive."""
+    watcher = LeaderboardWatcher(evaluated_dir)
+    clear = sys.stdout.isatty()
+    total = 0
+    drawn = False
+    try:
+        while True:
+            added = watcher.poll()
+            total += added
+            if added or not drawn:
+                drawn = True
+                rows, categories = watcher.leaderboard()
+                if json_path:
+                    write_json(rows, json_path)
+                if clear:
+                    print("\033[2J\033[H", end="")
+                bad_lines = watcher.bad_lines()
+                skipped = f", {bad_lines} malformed lines skipped" if bad_lines else ""
+                print(f"- {time.strftime('%H:%M:%S')} : {total} rows (+{added}) in {evaluated_dir}{skipped}\n")
+                print_leaderboard(rows, categories, show_rows=True)
+                sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
@@ -138,3 +138,8 @@ JUDGE_TEMPLATE = {
 평가: 평가 내용
 점수: 숫자""",
 }
+
+# --judge-format json 에서 JUDGE_TEMPLATE 의 출력 형식 부분을 대체
+JUDGE_JSON_OUTPUT_FORMAT = """# 출력 형식
+반드시 아래 키를 가진 JSON 객체 하나만 출력한다.
+{"평가": "평가 내용", "점수": 숫자}"""
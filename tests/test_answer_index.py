@@ -0,0 +1,43 @@
+from answer_index import AnswerIndex, NearDuplicates
+from judge_plan import JudgePlan
+
+JUDGE = {"model": "judge-a", "template": "t1"}
+ROW = {"id": 1, "outputs": ["같은 답변입니다. " * 5, "후속 답변입니다. " * 5]}
+
+
+def make_plan(judge_id):
+    return JudgePlan(lambda row, turn: f"{row['id']}|{turn}", lambda prompt, turn: prompt, judge_id=judge_id)
+
+
+def indexed(judge):
+    index = AnswerIndex(threshold=0.9)
+    for turn, text in (("single", ROW["outputs"][0]), ("multi", f"{ROW['outputs'][0]}\x00{ROW['outputs'][1]}")):
+        judgement = {"judge_message": "ok", "judge_score": 7.0}
+        index.add(1, turn, text, {"label": "other/default.jsonl", "judgement": judgement, "judge": judge})
+    return index
+
+
+def test_reuses_judgements_of_the_same_judge():
+    plan = make_plan(JUDGE)
+    rows = [dict(ROW)]
+    plan.add_rows("model/default.jsonl", rows)
+    near_duplicates = NearDuplicates(indexed(JUDGE), reuse=True)
+    near_duplicates.apply(plan, "model/default.jsonl", "model/default.jsonl", rows)
+
+    assert near_duplicates.reused == 2
+    assert set(plan.resolved) == {"1|single", "1|multi"}
+    assert rows[0]["near_duplicate_single"]["reused"]
+
+
+def test_other_or_unknown_judges_are_only_flagged():
+    for judge in ({"model": "judge-b", "template": "t1"}, {"model": "judge-a", "template": "t2"}, None):
+        plan = make_plan(JUDGE)
+        rows = [dict(ROW)]
+        plan.add_rows("model/default.jsonl", rows)
+        near_duplicates = NearDuplicates(indexed(judge), reuse=True)
+        near_duplicates.apply(plan, "model/default.jsonl", "model/default.jsonl", rows)
+
+        assert near_duplicates.matched == 2
+        assert near_duplicates.reused == 0
+        assert plan.resolved == {}
+        assert rows[0]["near_duplicate_multi"] == {"label": "other/default.jsonl", "similarity": 1.0, "reused": False}
@@ -0,0 +1,68 @@
+from generation_scheduler import FakeEngine, PipelinedGenerator
+
+QUESTIONS = [{"id": i, "category": "코딩(Coding)", "questions": [f"질문 {i}", f"후속 질문 {i}"]} for i in range(1, 6)]
+STRATEGIES = {
+    "default": [],
+    "1-shot": [{"role": "user", "content": "예시 질문"}, {"role": "assistant", "content": "예시 답변"}],
+}
+
+
+def format_messages(messages):
+    return "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+
+
+def echo(prompt):
+    # 마지막 user 메시지를 그대로 답변으로 돌려줌
+    return "답변: " + prompt.rsplit("user: ", 1)[1]
+
+
+def test_every_request_finishes_with_its_own_answers():
+    engine = FakeEngine(batch_size=3, respond=echo)
+    results = PipelinedGenerator(engine, format_messages).run(QUESTIONS, STRATEGIES)
+
+    assert set(results) == set(STRATEGIES)
+    for single, multi in results.values():
+        assert single == [f"답변: 질문 {i}" for i in range(1, 6)]
+        assert multi == [f"답변: 후속 질문 {i}" for i in range(1, 6)]
+    assert not engine.has_unfinished_requests()
+
+
+def test_multi_turn_prompt_contains_its_single_turn_answer():
+    engine = FakeEngine(batch_size=4, respond=echo)
+    PipelinedGenerator(engine, format_messages).run(QUESTIONS, STRATEGIES)
+
+    for strategy_name, prompts in STRATEGIES.items():
+        for i, question in enumerate(QUESTIONS):
+            prompt = engine.prompts[f"{strategy_name}|{i}|multi"]
+            expected = prompts + [
+                {"role": "user", "content": question["questions"][0]},
+                {"role": "assistant", "content": f"답변: {question['questions'][0]}"},
+                {"role": "user", "content": question["questions"][1]},
+            ]
+            assert prompt == format_messages(expected)
+
+
+def test_single_turn_requests_are_grouped_by_strategy():
+    engine = FakeEngine(batch_size=1)
+    order = []
+    add_request = engine.add_request
+
+    def record(request_id, *args):
+        order.append(request_id)
+        add_request(request_id, *args)
+
+    engine.add_request = record
+    PipelinedGenerator(engine, format_messages).run(QUESTIONS, STRATEGIES)
+
+    singles = [request_id.split("|")[0] for request_id in order[: len(QUESTIONS) * len(STRATEGIES)]]
+    assert singles == ["default"] * len(QUESTIONS) + ["1-shot"] * len(QUESTIONS)
+
+
+def test_pipelining_needs_fewer_steps_than_turn_barriers():
+    batch_size = 4
+    engine = FakeEngine(batch_size=batch_size)
+    PipelinedGenerator(engine, format_messages).run(QUESTIONS, STRATEGIES)
+
+    n_requests = 2 * len(QUESTIONS) * len(STRATEGIES)
+    barrier_steps = len(STRATEGIES) * 2 * -(-len(QUESTIONS) // batch_size)
+    assert -(-n_requests // batch_size) <= engine.steps < barrier_steps
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+
+from judge_parser import NO_MESSAGE, check_corpus, legacy_parse, parse_judge_output
+
+
+@pytest.mark.parametrize(
+    "content, score",
+    [
+        ("평가: 질문에 정확히 답했다.\n\n점수: 9", 9.0),
+        ("**평가:** 질문에 정확히 답했다.\n\n**점수:** 9", 9.0),
+        ("평가 : 질문에 정확히 답했다.\n점수 : 7점", 7.0),
+        ("평가: 질문에 정확히 답했다.\n점수: 7/10", 7.0),
+        ("평가: 질문에 정확히 답했다.\n점수: [[6.5]]", 6.5),
+        ("Evaluation: The answer is correct.\nScore: 8", 8.0),
+        ('{"평가": "질문에 정확히 답했다.", "점수": 9}', 9.0),
+        ('```json\n{"judge_message": "ok", "judge_score": 4}\n```', 4.0),
+    ],
+)
+def test_accepted_formats(content, score):
+    assert parse_judge_output(content)["judge_score"] == score
+
+
+@pytest.mark.parametrize(
+    "content, score, message",
+    [
+        # 평가문에 인용된 다른 라벨이 실제 점수를 덮어쓰면 안 됨
+        (
+            '평가: 모델은 요구된 "Rating: 3" 형식을 그대로 따랐다.\n\n점수: 9',
+            9.0,
+            '모델은 요구된 "Rating: 3" 형식을 그대로 따랐다.',
+        ),
+        (
+            "평가: 모델이 score: 2 라고 쓴 부분은 틀렸다.\n점수: 8",
+            8.0,
+            "모델이 score: 2 라고 쓴 부분은 틀렸다.",
+        ),
+        # 평가문 안에 "점수:" 가 인용되어도 마지막 "점수:" 가 최종 점수
+        (
+            "평가: 사용자가 '점수: 2' 를 요구했지만 무시했다.\n점수: 5",
+            5.0,
+            "사용자가 '점수: 2' 를 요구했지만 무시했다.",
+        ),
+    ],
+)
+def test_quoted_labels_do_not_override_the_final_score(content, score, message):
+    assert parse_judge_output(content) == {"judge_message": message, "judge_score": score}
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "평가: 1번은 8점, 2번은 5/10 수준",
+        "평가: 전반적으로 좋은 답변이다. 10점 만점에 7점 정도",
+        "",
+    ],
+)
+def test_unlabelled_numbers_are_parse_failures(content):
+    # 라벨 없는 숫자를 점수로 추정하지 않고 실패로 처리해 재시도되도록 함
+    with pytest.raises(ValueError):
+        parse_judge_output(content)
+
+
+def test_none_is_a_parse_failure():
+    with pytest.raises(ValueError):
+        parse_judge_output(None)
+
+
+def test_missing_message_label():
+    assert parse_judge_output("점수: 3") == {"judge_message": NO_MESSAGE, "judge_score": 3.0}
+
+
+def test_canonical_format_matches_the_legacy_parser():
+    content = "평가: 문법 오류가 있지만 질문의 의도는 파악했다.\n\n점수: 6"
+    assert parse_judge_output(content) == legacy_parse(content)
+
+
+@pytest.mark.parametrize("score", ["true", "false"])
+def test_boolean_json_score_is_rejected(score):
+    with pytest.raises(ValueError):
+        parse_judge_output(f'{{"평가": "ok", "점수": {score}}}')
+
+
+def test_every_judgement_in_the_evaluated_corpus_parses():
+    # 저장된 모든 평가를 각 응답 형식으로 다시 만들어 파싱 (python judge_parser.py -e ./evaluated 와 동일)
+    assert check_corpus(Path(__file__).resolve().parent.parent / "evaluated") == 0
@@ -0,0 +1,43 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import WorkItemScheduler
+
+
+def test_both_turns_of_a_row_are_in_flight_at_once():
+    # 두 turn 이 동시에 실행되어야만 barrier 를 통과함
+    barrier = threading.Barrier(2, timeout=5)
+    done = []
+
+    def judge(row, turn):
+        barrier.wait()
+        return {"turn": turn}
+
+    WorkItemScheduler(judge, lambda row, answers: done.append((row, answers)), threads=2).run([(0, "row")])
+
+    assert done == [("row", {"single": {"turn": "single"}, "multi": {"turn": "multi"}})]
+
+
+def test_rows_are_flushed_in_completion_order():
+    latencies = {0: 0.3, 1: 0.0, 2: 0.15}
+    done = []
+
+    def judge(row, turn):
+        time.sleep(latencies[row])
+        return {}
+
+    WorkItemScheduler(judge, lambda row, answers: done.append(row), threads=6).run((i, i) for i in range(3))
+
+    assert done == [1, 2, 0]
+
+
+def test_errors_are_reraised():
+    def judge(row, turn):
+        if turn == "multi":
+            raise ValueError("boom")
+        return {}
+
+    with pytest.raises(ValueError, match="boom"):
+        WorkItemScheduler(judge, lambda row, answers: None, threads=2).run([(0, 0)])
@@ -0,0 +1,9 @@
+import pytest
+
+from score_index import ScoreIndex
+from score_stats import print_stats
+
+
+def test_empty_index_is_a_clear_error():
+    with pytest.raises(ValueError, match="no model/strategy"):
+        print_stats(ScoreIndex.empty(), None, 100, 0.05, 0)
@@ -0,0 +1,39 @@
+import json
+
+from score_watch import LeaderboardWatcher
+
+
+def judged_row(row_id, single, multi):
+    return json.dumps(
+        {
+            "id": row_id,
+            "category": "추론(Reasoning)",
+            "query_single": {"judge_message": "", "judge_score": single},
+            "query_multi": {"judge_message": "", "judge_score": multi},
+        }
+    )
+
+
+def test_malformed_lines_are_skipped_and_polling_continues(tmp_path):
+    path = tmp_path / "model" / "default.jsonl"
+    path.parent.mkdir()
+    bad_lines = [
+        '{"id": 2, "category": ',
+        json.dumps({"id": 3, "query_single": {"judge_score": 1}, "query_multi": {"judge_score": 1}}),
+        "[1, 2]",
+    ]
+    path.write_text("\n".join([judged_row(1, 8, 6.0)] + bad_lines) + "\n", encoding="utf-8")
+
+    watcher = LeaderboardWatcher(tmp_path)
+    assert watcher.poll() == 1
+    assert watcher.bad_lines() == 3
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(judged_row(4, 6, 4) + "\n" + judged_row(5, "x", 1) + "\n" + judged_row(6, 1, 1))
+    # 마지막 줄은 아직 쓰이는 중이므로 다음 확인 때 읽음
+    assert watcher.poll() == 1
+    assert watcher.bad_lines() == 4
+
+    rows, _ = watcher.leaderboard()
+    assert rows[0]["rows"] == 2
+    assert rows[0]["single"] == 7.0 and rows[0]["multi"] == 5.0
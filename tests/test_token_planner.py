@@ -0,0 +1,62 @@
+import pytest
+
+from token_planner import (
+    DEFAULT_CATEGORY_CHAR_CAPS,
+    TokenBudgetPlanner,
+    default_category_caps,
+    length_bucket,
+    parse_category_caps,
+)
+
+
+def count_words(text):
+    # 공백 단위로 자르는 CPU 토크나이저
+    return len(text.split())
+
+
+def test_max_tokens_is_the_remaining_context_under_the_category_cap():
+    planner = TokenBudgetPlanner(count_words, model_len=100, category_caps={"Coding": 30})
+
+    assert planner.plan("a " * 10, "코딩(Coding)") == 30
+    assert planner.plan("a " * 80, "코딩(Coding)") == 20
+    assert planner.plan("a " * 10, "글쓰기(Writing)") == 90
+    # 프롬프트만으로 컨텍스트를 넘으면 1 토큰만 예약하고 따로 집계
+    assert planner.plan("a " * 120) == 1
+    assert planner.stats["overflow"] == 1
+    assert planner.stats["capped"] == 1
+
+
+def test_plan_batch_orders_by_length_bucket_and_keeps_limits_in_prompt_order():
+    planner = TokenBudgetPlanner(count_words, model_len=64)
+    prompts = ["a " * 40, "a " * 2, "a " * 9, "a " * 3]
+
+    order, max_tokens = planner.plan_batch(prompts)
+
+    assert order == [1, 3, 2, 0]
+    assert max_tokens == [24, 62, 55, 61]
+    assert [length_bucket(count_words(prompts[i])) for i in order] == [2, 2, 4, 6]
+
+
+def test_default_caps_are_converted_from_characters_to_tokens():
+    # 글자 2개가 토큰 1개인 토크나이저면 글자 상한의 절반
+    caps = default_category_caps(lambda text: len(text) // 2, texts=["가나다라마바사아"])
+    assert caps == {name: chars // 2 for name, chars in DEFAULT_CATEGORY_CHAR_CAPS.items()}
+
+
+def test_default_caps_use_the_benchmark_questions():
+    assert default_category_caps(len) == DEFAULT_CATEGORY_CHAR_CAPS
+
+
+def test_parse_category_caps():
+    assert parse_category_caps("") == {}
+    assert parse_category_caps("Writing=3072, Coding=2048") == {"Writing": 3072, "Coding": 2048}
+    with pytest.raises(ValueError):
+        parse_category_caps("Writing")
+
+
+def test_summary_reports_saved_tokens():
+    planner = TokenBudgetPlanner(count_words, model_len=100, category_caps={"Math": 10})
+    planner.plan_batch(["a b c", "d e"], ["수학(Math)", "수학(Math)"])
+
+    assert planner.stats["reserved"] == 20
+    assert "180 토큰 90% 절약" in planner.summary()
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import evaluator
+import work_queue
+from judge_plan import JudgePlan
+from mock_server import start_mock_server
+from work_queue import WorkQueue
+
+ROWS = [
+    {
+        "id": i,
+        "category": "추론(Reasoning)",
+        "questions": [f"질문 {i}", f"후속 질문 {i}"],
+        "outputs": [f"답변 {i}", f"후속 답변 {i}"],
+        "references": [None, None],
+    }
+    for i in range(1, 4)
+]
+
+
+def write_generated(root: Path):
+    path = root / "generated" / "model" / "default.jsonl"
+    path.parent.mkdir(parents=True)
+    path.write_text("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in ROWS), encoding="utf-8")
+
+
+def test_worker_started_before_the_coordinator_judges_every_row(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(work_queue, "POLL_INTERVAL", 0.05)
+    write_generated(tmp_path)
+    server = start_mock_server()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    try:
+        # 큐가 비어 있어도 coordinator 가 닫기 전까지 worker 가 기다려야 함
+        worker = threading.Thread(
+            target=work_queue.main, args=(["-q", "queue.sqlite3", "-k", "x", "--base-url", base_url, "-t", "2"],)
+        )
+        worker.start()
+        evaluator.main(
+            ["-o", "generated", "-k", "x", "--base-url", base_url, "--queue", "queue.sqlite3", "-t", "0", "--no-cache"]
+        )
+        worker.join(timeout=30)
+        assert not worker.is_alive()
+    finally:
+        server.shutdown()
+
+    with open(tmp_path / "evaluated" / "model" / "default.jsonl", encoding="utf-8-sig") as f:
+        rows = [json.loads(line) for line in f]
+    assert sorted(row["id"] for row in rows) == [1, 2, 3]
+    for row in rows:
+        for turn in ("query_single", "query_multi"):
+            assert 0 <= row[turn]["judge_score"] <= 10
+
+
+def test_expired_lease_is_reclaimed(tmp_path, monkeypatch):
+    plan = JudgePlan(build_prompt=lambda row, turn: f"{row['id']}|{turn}", make_key=lambda prompt, turn: prompt)
+    plan.add_rows("model/default.jsonl", ROWS[:1])
+    queue = WorkQueue(tmp_path / "queue.sqlite3", lease_seconds=60.0)
+    queue.enqueue([(None, tmp_path / "out.jsonl", "model/default.jsonl", ROWS[:1])], plan)
+    answer = {"judge_message": "ok", "judge_score": 5.0}
+
+    first = queue.claim("crashed")
+    second = queue.claim("alive")
+    assert second[0] != first[0]
+    queue.complete(second[0], "alive", answer)
+    # 첫 worker 의 임대가 유효한 동안에는 다른 worker 가 가져가지 못함
+    assert queue.claim("alive") is None
+
+    now = time.time()
+    monkeypatch.setattr(work_queue.time, "time", lambda: now + 61)
+    assert queue.claim("alive") == first
+    queue.complete(first[0], "alive", answer)
+
+    assert queue.remaining() == 0
+    assert queue.conn.execute("SELECT worker, attempts FROM tasks WHERE key = ?", (first[0],)).fetchone() == (
+        "alive",
+        2,
+    )
+    queue.close()
@@ -0,0 +1,212 @@
+import argparse
+import json
+import math
+from collections import Counter
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 카테고리별 답변 길이 상한 (글자 수). 기존 generated/ 답변 글자 수 p99 를 512 단위로 올림
+# 토크나이저마다 글자당 토큰 수가 다르므로 default_category_caps 로 토큰 상한으로 바꿔 사용
+DEFAULT_CATEGORY_CHAR_CAPS = {
+    "Writing": 8192,
+    "Coding": 4096,
+    "Math": 6656,
+    "Reasoning": 4096,
+    "Understanding": 4096,
+    "Grammar": 3584,
+}
+# 글자/토큰 비율을 재는 한국어 텍스트 (벤치마크 질문)
+CALIBRATION_FILE = Path(__file__).with_name("questions.jsonl")
+
+
+def chars_per_token(count_tokens: Callable[[str], int], texts: Sequence[str]) -> float:
+    n_tokens = sum(count_tokens(text) for text in texts)
+    return sum(len(text) for text in texts) / n_tokens if n_tokens else 1.0
+
+
+def default_category_caps(count_tokens: Callable[[str], int], texts: Optional[Sequence[str]] = None) -> Dict[str, int]:
+    """`DEFAULT_CATEGORY_CHAR_CAPS` in tokens, using the characters per token of `count_tokens` on `texts`.
+
+    `texts` defaults to the questions in `CALIBRATION_FILE`.
+    """
+    if texts is None:
+        with open(CALIBRATION_FILE, encoding="utf-8-sig") as f:
+            texts = [question for row in map(json.loads, filter(str.strip, f)) for question in row["questions"]]
+    ratio = chars_per_token(count_tokens, texts)
+    return {name: math.ceil(chars / ratio) for name, chars in DEFAULT_CATEGORY_CHAR_CAPS.items()}
+
+
+def parse_category_caps(spec: Optional[str]) -> Dict[str, int]:
+    """Parse `Writing=3072,Coding=2048` into token caps that override the defaults ("" keeps the defaults)."""
+    caps = {}
+    for item in filter(None, (spec or "").split(",")):
+        name, separator, value = item.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid category cap '{item}' (expected NAME=TOKENS)")
+        caps[name.strip()] = int(value)
+    return caps
+
+
+def length_bucket(n_tokens: int) -> int:
+    # 2의 거듭제곱 구간: 0-1, 2-3, 4-7, ... (구간 번호 = bit 길이)
+    return n_tokens.bit_length()
+
+
+class TokenBudgetPlanner:
+    """Gives every generation request its own `max_tokens` instead of the whole context length.
+
+    A request gets what is left of `model_len` after its prompt, further capped by its category
+    (matched exactly or by a substring such as "Coding" in "코딩(Coding)"). `count_tokens` is any
+    prompt -> token count function, normally the served model's tokenizer, so planning runs on
+    CPU. `summary()` reports the reserved tokens against the old `max_tokens = model_len`.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        model_len: int,
+        category_caps: Optional[Dict[str, int]] = None,
+        default_cap: Optional[int] = None,
+    ):
+        self.count_tokens = count_tokens
+        self.model_len = model_len
+        self.category_caps = category_caps or {}
+        self.default_cap = default_cap
+        self.lock = Lock()
+        self.stats = Counter()
+        self.buckets = Counter()
+
+    def category_cap(self, category: Optional[str]) -> Optional[int]:
+        if category is None:
+            return self.default_cap
+        if category in self.category_caps:
+            return self.category_caps[category]
+        for name, cap in self.category_caps.items():
+            if name in category:
+                return cap
+        return self.default_cap
+
+    def plan(self, prompt: str, category: Optional[str] = None, prompt_tokens: Optional[int] = None) -> int:
+        """max_tokens for one request."""
+        if prompt_tokens is None:
+            prompt_tokens = self.count_tokens(prompt)
+        remaining = self.model_len - prompt_tokens
+        cap = self.category_cap(category)
+        max_tokens = remaining if cap is None else min(cap, remaining)
+
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["reserved_before"] += self.model_len
+            self.stats["reserved"] += max(max_tokens, 1)
+            self.stats["capped"] += cap is not None and cap < remaining
+            # 프롬프트만으로 컨텍스트를 넘는 요청. 엔진이 거부하거나 잘라내므로 따로 집계
+            self.stats["overflow"] += remaining < 1
+            self.buckets[length_bucket(prompt_tokens)] += 1
+        return max(max_tokens, 1)
+
+    def plan_batch(
+        self, prompts: Sequence[str], categories: Optional[Sequence[Optional[str]]] = None
+    ) -> Tuple[List[int], List[int]]:
+        """(submission order, max_tokens per prompt): prompts ordered by length bucket, shortest first.
+
+        Submitting similar lengths together lets the engine fill each batch with requests that
+        finish prefill at about the same cost instead of mixing very long and short prompts.
+        """
+        categories = categories or [None] * len(prompts)
+        prompt_tokens = [self.count_tokens(prompt) for prompt in prompts]
+        max_tokens = [
+            self.plan(prompt, category, n_tokens)
+            for prompt, category, n_tokens in zip(prompts, categories, prompt_tokens)
+        ]
+        order = sorted(range(len(prompts)), key=lambda i: (length_bucket(prompt_tokens[i]), prompt_tokens[i]))
+        return order, max_tokens
+
+    def record_finish(self, hit_limit: bool):
+        with self.lock:
+            self.stats["finished"] += 1
+            self.stats["hit_limit"] += hit_limit
+
+    def summary(self) -> str:
+        with self.lock:
+            stats = dict(self.stats)
+            buckets = sorted(self.buckets.items())
+        if not stats.get("requests"):
+            return ""
+        saved = stats["reserved_before"] - stats["reserved"]
+        lines = [
+            f"- 토큰 예산 : 요청 {stats['requests']}개, max_tokens 합계 {stats['reserved']:,} "
+            f"(기존 {stats['reserved_before']:,}, {saved:,} 토큰 {saved / stats['reserved_before']:.0%} 절약)",
+            f"- 카테고리 상한 적용 {stats.get('capped', 0)}개, 컨텍스트 초과 프롬프트 {stats.get('overflow', 0)}개"
+            + (
+                f", max_tokens 도달 {stats.get('hit_limit', 0)}/{stats['finished']}개" if stats.get("finished") else ""
+            ),
+            "- 프롬프트 길이 구간 : " + ", ".join(f"<{2**bucket}: {count}" for bucket, count in buckets),
+        ]
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    from generation import format_plain_messages, load_questions, multi_turn_messages, single_turn_messages
+    from templates import PROMPT_STRATEGY
+
+    parser = argparse.ArgumentParser(description="Plan per-request max_tokens for generation on CPU")
+    parser.add_argument("-t", "--tokenizer", help="HF tokenizer (default: 1 token per character)", default=None)
+    parser.add_argument("-ml", "--model_len", help="Maximum Model Length", default=4096, type=int)
+    parser.add_argument("--category_caps", help="Per-category caps, e.g. Writing=3072,Coding=2048", default="")
+    parser.add_argument("-q", "--questions", help="Questions file", default="questions.jsonl")
+    parser.add_argument(
+        "-g", "--generated", help="Existing outputs (<strategy>.jsonl) for multi-turn prompts and truncation check"
+    )
+    args = parser.parse_args(argv)
+
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+
+        def count_tokens(text):
+            # chat template 을 적용한 프롬프트에는 BOS 가 이미 들어 있으므로 special token 을 붙이지 않음
+            return len(tokenizer(text, add_special_tokens=False).input_ids)
+
+        def format_messages(messages):
+            return tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+
+    else:
+        # 한국어는 대략 글자당 1토큰 이하이므로 글자 수를 보수적인 토큰 수로 사용
+        count_tokens, format_messages = len, format_plain_messages
+
+    category_caps = {**default_category_caps(count_tokens), **parse_category_caps(args.category_caps)}
+    print(f"- 카테고리 상한 (토큰) : {category_caps}")
+    planner = TokenBudgetPlanner(count_tokens, args.model_len, category_caps)
+    questions = load_questions(args.questions)
+    over_cap = Counter()
+    for strategy_name, prompts in PROMPT_STRATEGY.items():
+        outputs = {}
+        if args.generated and (Path(args.generated) / f"{strategy_name}.jsonl").exists():
+            with open(Path(args.generated) / f"{strategy_name}.jsonl", encoding="utf-8-sig") as f:
+                outputs = {row["id"]: row["outputs"] for row in map(json.loads, filter(str.strip, f))}
+
+        single_prompts = [format_messages(single_turn_messages(prompts, q["questions"])) for q in questions]
+        categories = [q["category"] for q in questions]
+        _, single_max_tokens = planner.plan_batch(single_prompts, categories)
+        if not outputs:
+            continue
+        multi_prompts = [
+            format_messages(multi_turn_messages(prompts, q["questions"], outputs[q["id"]][0])) for q in questions
+        ]
+        _, multi_max_tokens = planner.plan_batch(multi_prompts, categories)
+
+        # 기존 답변이 새 max_tokens 를 넘었는지 = 이 계획이었다면 잘렸을 답변
+        for q, single_limit, multi_limit in zip(questions, single_max_tokens, multi_max_tokens):
+            for output, limit in zip(outputs[q["id"]], (single_limit, multi_limit)):
+                over_cap[q["category"]] += count_tokens(output) > limit
+
+    print(planner.summary())
+    if args.generated:
+        print(f"- 기존 답변 중 max_tokens 를 넘는 답변 : {dict(over_cap)}")
+
+
+if __name__ == "__main__":
+    main()
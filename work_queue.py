@@ -0,0 +1,332 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional, Tuple, Union
+
+from judge_plan import TURNS, JudgePlan
+from metrics import CURRENT_LABEL, METRICS
+
+DEFAULT_LEASE_SECONDS = 300.0
+POLL_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tasks (
+    key TEXT PRIMARY KEY,
+    label TEXT,
+    turn TEXT,
+    prompt TEXT,
+    status TEXT DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER DEFAULT 0,
+    judge_message TEXT,
+    judge_score REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_until);
+CREATE TABLE IF NOT EXISTS rows (
+    label TEXT,
+    row_id INTEGER,
+    output_file TEXT,
+    data TEXT,
+    single_key TEXT,
+    multi_key TEXT,
+    written INTEGER DEFAULT 0,
+    PRIMARY KEY (label, row_id)
+);
+"""
+
+
+class WorkQueue:
+    """SQLite queue of judge prompts shared by a coordinator and any number of worker processes.
+
+    Each unique prompt (see `JudgePlan`) is one task. Workers lease tasks for `lease_seconds`
+    and renew the lease while judging; a task whose lease ran out (crashed worker) is handed to
+    the next worker that asks. The coordinator sets the `closed` meta flag once every task is
+    enqueued; until then idle workers keep polling. Hosts sharing the queue file need a
+    filesystem with working SQLite locking (fcntl locks, e.g. NFSv4 with locking enabled) and
+    roughly synchronized clocks.
+    """
+
+    def __init__(self, path: Union[str, Path], lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.lock = Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=60)
+        # WAL 은 공유 메모리(-shm)를 쓰므로 NFS 등 네트워크 파일시스템에서는 동작하지 않음. 여러 호스트가
+        # 같은 파일을 쓰므로 rollback journal 을 사용
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(_SCHEMA)
+
+    def set_meta(self, **values):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                [(name, json.dumps(value)) for name, value in values.items()],
+            )
+
+    def meta(self) -> dict:
+        with self.lock:
+            return {name: json.loads(value) for name, value in self.conn.execute("SELECT name, value FROM meta")}
+
+    def enqueue(self, prepared_files, plan: JudgePlan, cache=None) -> int:
+        """Add the rows of `prepared_files` and their unique prompts; returns the number of new tasks."""
+        tasks, rows = {}, []
+        for _, output_file, label, file_rows in prepared_files:
+            for row in file_rows:
+                keys = {}
+                for turn in TURNS:
+                    key, prompt = plan.lookup(label, row["id"], turn)
+                    keys[turn] = key
+                    tasks.setdefault(key, (key, label, turn, prompt))
+                data = json.dumps(row, ensure_ascii=False)
+                rows.append((label, row["id"], str(output_file), data, keys["single"], keys["multi"]))
+
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO tasks (key, label, turn, prompt) VALUES (?, ?, ?, ?)", tasks.values()
+                )
+                # 다시 넣은 행은 출력에 없다는 뜻이므로 written 을 되돌림 (결과가 있는 task 는 재평가하지 않음)
+                self.conn.executemany(
+                    "INSERT INTO rows (label, row_id, output_file, data, single_key, multi_key) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (label, row_id) DO UPDATE SET "
+                    "output_file = excluded.output_file, data = excluded.data, single_key = excluded.single_key, "
+                    "multi_key = excluded.multi_key, written = 0",
+                    rows,
+                )
+                added = self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] - before
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        # 유사 답변으로 정해졌거나 캐시에 있는 프롬프트는 worker 에게 넘기지 않고 바로 완료 처리
+        for key in tasks:
+            answer = plan.resolved.get(key)
+            if answer is None and cache is not None:
+                answer = cache.get(key)
+            if answer is not None:
+                self.complete(key, None, answer)
+        return added
+
+    def is_closed(self) -> bool:
+        """True once the coordinator has enqueued every task."""
+        return bool(self.meta().get("closed"))
+
+    def claim(self, worker: str) -> Optional[Tuple[str, str, str, str]]:
+        """Lease one pending (or expired) task to `worker`; returns (key, label, turn, prompt) or None."""
+        now = time.time()
+        # UPDATE ... RETURNING 은 SQLite 3.35 이상에서만 되므로 쓰기 잠금을 잡은 채 SELECT 후 UPDATE
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                task = self.conn.execute(
+                    "SELECT key, label, turn, prompt FROM tasks WHERE status = 'pending' "
+                    "OR (status = 'leased' AND lease_until < ?) LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if task is not None:
+                    self.conn.execute(
+                        "UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                        "WHERE key = ?",
+                        (worker, now + self.lease_seconds, task[0]),
+                    )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            return task
+
+    def renew(self, worker: str) -> int:
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE worker = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, worker),
+            ).rowcount
+
+    def complete(self, key: str, worker: Optional[str], answer: Dict[str, Union[str, float]]):
+        # 임대가 만료되어 다른 worker 가 가져간 task 라도 먼저 끝난 결과를 사용
+        with self.lock:
+            self.conn.execute(
+                "UPDATE tasks SET status = 'done', worker = COALESCE(?, worker), judge_message = ?, judge_score = ? "
+                "WHERE key = ? AND status != 'done'",
+                (worker, answer["judge_message"], answer["judge_score"], key),
+            )
+
+    def remaining(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM tasks WHERE status != 'done'").fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+
+    def ready_rows(self) -> List[Tuple[str, int, str, dict, Dict[str, Tuple[str, dict]]]]:
+        """Unwritten rows whose single and multi turn tasks are both done, with {turn: (key, answer)}."""
+        with self.lock:
+            records = self.conn.execute(
+                "SELECT r.label, r.row_id, r.output_file, r.data, s.key, s.judge_message, s.judge_score, "
+                "m.key, m.judge_message, m.judge_score FROM rows r "
+                "JOIN tasks s ON s.key = r.single_key JOIN tasks m ON m.key = r.multi_key "
+                "WHERE r.written = 0 AND s.status = 'done' AND m.status = 'done'"
+            ).fetchall()
+        ready = []
+        for label, row_id, output_file, data, *judged in records:
+            answers = {
+                turn: (key, {"judge_message": message, "judge_score": score})
+                for turn, (key, message, score) in zip(TURNS, (judged[:3], judged[3:]))
+            }
+            ready.append((label, row_id, output_file, json.loads(data), answers))
+        return ready
+
+    def mark_written(self, rows: List[Tuple[str, int]]):
+        with self.lock:
+            self.conn.executemany("UPDATE rows SET written = 1 WHERE label = ? AND row_id = ?", rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker_threads(queue: WorkQueue, client, threads: int, worker: str, stop: Optional[Event] = None) -> int:
+    """Judge queue tasks with `threads` threads until the queue is closed and empty; returns the number judged here."""
+    from evaluator import judge_prompt
+
+    stop = stop or Event()
+    judged = [0]
+    judged_lock = Lock()
+
+    def heartbeat():
+        while not stop.wait(queue.lease_seconds / 3):
+            queue.renew(worker)
+
+    def work():
+        while not stop.is_set():
+            task = queue.claim(worker)
+            if task is None:
+                # coordinator 가 아직 task 를 넣는 중이거나, 다른 worker 가 잡고 있는 task 가 남아 있으면
+                # 기다렸다가 다시 확인 (임대가 만료된 task 는 회수)
+                if queue.is_closed() and queue.remaining() == 0:
+                    return
+                stop.wait(POLL_INTERVAL)
+                continue
+            key, label, turn, prompt = task
+            CURRENT_LABEL.set(label)
+            # meta 는 coordinator 가 task 보다 먼저 기록하므로 task 를 받은 뒤에 읽음
+            meta = queue.meta()
+            answer = judge_prompt(
+                client, prompt, meta.get("judge_model"), turn == "multi", judge_format=meta.get("judge_format", "text")
+            )
+            queue.complete(key, worker, answer)
+            with judged_lock:
+                judged[0] += 1
+
+    heartbeat_thread = Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    workers = [Thread(target=work, daemon=True) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    try:
+        for thread in workers:
+            thread.join()
+    finally:
+        stop.set()
+    return judged[0]
+
+
+def flush_ready_rows(queue: WorkQueue, writer, cache=None, resolved=()) -> int:
+    from evaluator import IMPOSSIBLE_ANSWER
+
+    ready = queue.ready_rows()
+    for label, row_id, output_file, row, answers in ready:
+        for turn, (key, answer) in answers.items():
+            row[f"query_{turn}"] = answer
+            # worker 는 캐시를 모르므로 coordinator 가 결과를 캐시에 옮김 (유사 답변에서 가져온 평가는 제외)
+            if cache is not None and answer != IMPOSSIBLE_ANSWER and key not in resolved:
+                cache.put(key, answer)
+        writer.write(Path(output_file), row)
+    queue.mark_written([(label, row_id) for label, row_id, *_ in ready])
+    return len(ready)
+
+
+def run_coordinator(client, json_files, input_dir: Path, output_dir: Path, args, writer, cache=None):
+    """Enqueue every pending row, judge with `-t` local threads alongside remote workers and write results."""
+    from evaluator import create_judge_plan, load_near_duplicates, prepare_files
+
+    queue = WorkQueue(args.queue, lease_seconds=args.lease_seconds)
+    queue.set_meta(judge_model=args.judge_model, judge_format=args.judge_format, closed=False)
+    plan = create_judge_plan(args.judge_model, args.judge_format)
+    prepared_files = prepare_files(
+        json_files, input_dir, output_dir, args.resume, plan, load_near_duplicates(args, output_dir)
+    )
+    added = queue.enqueue(prepared_files, plan, cache)
+    queue.set_meta(closed=True)
+    print(f"- Work queue : {args.queue} (새 task {added}개, 남은 task {queue.remaining()}개)")
+
+    stop = Event()
+    local = None
+    if args.threads > 0:
+        local = Thread(target=run_worker_threads, args=(queue, client, args.threads, worker_id(), stop), daemon=True)
+        local.start()
+    try:
+        while queue.remaining():
+            flush_ready_rows(queue, writer, cache, plan.resolved)
+            time.sleep(POLL_INTERVAL)
+        flush_ready_rows(queue, writer, cache, plan.resolved)
+    finally:
+        stop.set()
+        if local is not None:
+            local.join()
+        print(f"- Work queue : {queue.counts()}")
+        queue.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Judge worker for a work queue created by `evaluator.py --queue`")
+    parser.add_argument("-q", "--queue", help="Work queue (SQLite) shared with the coordinator", required=True)
+    parser.add_argument("-k", "--openai-api-key", help="OpenAI API Key", required=True)
+    parser.add_argument("-t", "--threads", help="Concurrent judge calls in this worker", default=16, type=int)
+    parser.add_argument("--azure", help="Use Azure OpenAI", action="store_true")
+    parser.add_argument("--base-url", help="OpenAI-compatible API base URL (e.g. mock_server.py)", default=None)
+    parser.add_argument(
+        "--lease-seconds", help="Lease length; unfinished tasks return to the queue after it", default=300, type=float
+    )
+    parser.add_argument("--metrics-file", help="Append per-request judge metrics (JSONL)", default=None)
+    args = parser.parse_args(argv)
+
+    from evaluator import create_azure_openai_client, create_openai_client
+
+    if args.azure:
+        client = create_azure_openai_client(args.openai_api_key)
+    else:
+        client = create_openai_client(args.openai_api_key, base_url=args.base_url)
+
+    queue = WorkQueue(args.queue, lease_seconds=args.lease_seconds)
+    METRICS.configure(args.metrics_file)
+    worker = worker_id()
+    print(f"- Worker {worker} : {queue.remaining()} tasks remaining in {args.queue}")
+    try:
+        judged = run_worker_threads(queue, client, args.threads, worker)
+    finally:
+        METRICS.close()
+        queue.close()
+    print(f"- Worker {worker} : judged {judged} prompts")
+    summary = METRICS.summary()
+    if summary:
+        print(summary)
+
+
+if __name__ == "__main__":
+    main()